@@ -0,0 +1,147 @@
+"""Tiện ích dùng chung cho các benchmark: frame giả lập, đo bộ nhớ, ghi kết quả JSON"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def parse_resolution(text):
+    """'640x480' -> (640, 480)"""
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def parse_list(text, cast=str):
+    return [cast(item) for item in text.split(',') if item]
+
+
+def synthetic_frames(width, height, count=64, seed=0):
+    """
+    Tập frame BGR giả lập (nhiễu + khối sáng di chuyển) dùng lặp vòng, tạo sẵn để không tính chi phí sinh frame
+    """
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        x = int((width - width // 4) * i / max(count - 1, 1))
+        cv2.rectangle(frame, (x, height // 3), (x + width // 4, height // 3 + height // 3), (200, 180, 160), -1)
+        frames.append(frame)
+    return frames
+
+
+def recorded_frames(path, width, height, limit=300):
+    """Đọc tối đa limit frame từ file video, resize về (width, height)"""
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        if frame.shape[1] != width or frame.shape[0] != height:
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        frames.append(frame)
+    capture.release()
+    if not frames:
+        raise RuntimeError(f"Không đọc được frame nào từ {path}")
+    return frames
+
+
+def peak_rss_mb():
+    """RSS lớn nhất của tiến trình (MB), None nếu nền tảng không hỗ trợ"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả KB, macOS trả byte
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentiles(values, ps=(50, 95, 99)):
+    if not len(values):
+        return {f"p{p}": None for p in ps}
+    array = np.asarray(values, dtype=np.float64)
+    return {f"p{p}": float(np.percentile(array, p)) for p in ps}
+
+
+def measure_allocations(fn, iterations):
+    """
+    Chạy fn(i) iterations lần dưới tracemalloc
+    Returns: dict số block / byte cấp phát ròng mỗi lần gọi và đỉnh bộ nhớ Python được theo dõi
+    """
+    tracemalloc.start()
+    try:
+        fn(0)  # khởi động: cache, buffer cấp phát lần đầu
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        for i in range(iterations):
+            fn(i)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    stats = after.compare_to(before, 'filename')
+    return {
+        'net_blocks_per_call': sum(s.count_diff for s in stats) / iterations,
+        'net_bytes_per_call': sum(s.size_diff for s in stats) / iterations,
+        'traced_peak_kb': peak / 1024,
+    }
+
+
+def time_calls(fn, iterations, warmup=10):
+    """Thời gian từng lần gọi fn(i) (ms)"""
+    for i in range(warmup):
+        fn(i)
+    durations = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def summarize_durations(durations):
+    return {
+        'iterations': len(durations),
+        'mean_ms': float(np.mean(durations)) if durations else None,
+        **{f"{k}_ms": v for k, v in percentiles(durations).items()},
+    }
+
+
+def environment():
+    """Thông tin môi trường để so sánh kết quả giữa các lần chạy"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+    }
+
+
+def write_results(path, name, results, config=None):
+    """Ghi kết quả JSON (sắp khoá cố định để diff được giữa các phiên bản)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    payload = {'benchmark': name, 'environment': environment(), 'config': config or {}, 'results': results}
+    with open(path, 'w') as file:
+        json.dump(payload, file, indent=2, sort_keys=True)
+    print(f"💾 Đã ghi kết quả: {path}")
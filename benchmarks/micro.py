@@ -0,0 +1,190 @@
+"""
+Micro-benchmark các bước riêng lẻ của pipeline (không cần model / camera)
+    overlay          DrowsinessDetector._draw_overlay (nội dung cố định / thay đổi mỗi frame)
+    drowsy_state     DrowsinessDetector._update_drowsy_state + AlertStateMachine
+    clip_persist     ClipPersister: lưu một clip (JPEG / video) vào thư mục + DB tạm
+    drowsy_video     VideoManager.get_drowsy_video: dựng mp4 từ JPEG của một clip
+
+Ví dụ:
+    python -m benchmarks.micro --output bench_results/micro.json
+    python -m benchmarks.micro --only overlay,drowsy_state --resolution 1280x720
+"""
+import argparse
+import os
+import tempfile
+from types import SimpleNamespace
+import numpy as np
+from benchmarks.common import (measure_allocations, parse_list, parse_resolution, summarize_durations,
+                               synthetic_frames, time_calls, write_results)
+import db.db as db
+from core.alert_state import AlertStateMachine
+from core.DrowsinessDetector import DrowsinessDetector
+from core.frame_record import FrameClock
+from core.frame_ring import FrameSnapshot
+from core.overlay import OverlayRenderer
+
+CLASS_NAMES = {0: 'Drowsy', 1: 'Natural'}
+
+
+def bench_overlay(args):
+    width, height = args.resolution
+    frame = synthetic_frames(width, height, count=1)[0]
+    detector = SimpleNamespace(
+        overlay=OverlayRenderer(), alert_active=False, current_class='Natural', current_confidence=0.93,
+        _get_alert_progress=lambda: 0.0,
+    )
+
+    def draw_static(i):
+        DrowsinessDetector._draw_overlay(detector, frame, 0.1, 0.9)
+
+    def draw_changing(i):
+        # Mỗi frame đổi confidence / tiến trình -> phải render lại tile
+        detector.current_confidence = (i % 1000) / 1000
+        detector._get_alert_progress = lambda: (i % 50) / 50
+        DrowsinessDetector._draw_overlay(detector, frame, (i % 100) / 100, 0.9)
+
+    return {
+        'static': {**summarize_durations(time_calls(draw_static, args.iterations)),
+                   'allocations': measure_allocations(draw_static, args.iterations)},
+        'changing': {**summarize_durations(time_calls(draw_changing, args.iterations)),
+                     'allocations': measure_allocations(draw_changing, args.iterations)},
+    }
+
+
+def bench_drowsy_state(args):
+    # Chuỗi kết quả 30 FPS: tỉnh táo, buồn ngủ kéo dài (đủ để cảnh báo), rồi tỉnh táo lại
+    pattern = [False] * 300 + [True] * 300 + [False] * 300
+    record_clock = FrameClock()
+    start_ns = record_clock.next().ts_ns
+    records = [record_clock.next(start_ns + int(i * 1e9 / 30)) for i in range(len(pattern))]
+    counts = {'alerts': 0, 'saves': 0}
+
+    def make_detector():
+        return SimpleNamespace(
+            alerts=AlertStateMachine(3), current_class='Unknown', current_confidence=0.0, callback=None,
+            _request_save=lambda record: counts.__setitem__('saves', counts['saves'] + 1),
+            _trigger_alert=lambda frame, ratio, conf: counts.__setitem__('alerts', counts['alerts'] + 1),
+        )
+
+    state = {'detector': make_detector()}
+
+    def update(i):
+        index = i % len(pattern)
+        if index == 0:
+            state['detector'] = make_detector()
+        is_drowsy = pattern[index]
+        DrowsinessDetector._update_drowsy_state(state['detector'], records[index], is_drowsy, 0.9,
+                                                'Drowsy' if is_drowsy else 'Natural', None)
+
+    iterations = max(args.iterations, len(pattern))
+    durations = time_calls(update, iterations, warmup=0)
+    return {
+        **summarize_durations(durations),
+        'sequence_length': len(pattern),
+        'alerts': counts['alerts'],
+        'save_requests': counts['saves'],
+        'allocations': measure_allocations(update, iterations),
+    }
+
+
+def _make_snapshot(args, count=90):
+    width, height = args.resolution
+    frames = np.stack(synthetic_frames(width, height, count=count))
+    clock = FrameClock()
+    start_ns = clock.next().ts_ns
+    return clock, FrameSnapshot(
+        seq=np.arange(count, dtype=np.int64),
+        ts_ns=start_ns + (np.arange(count, dtype=np.int64) * int(1e9 / 30)),
+        confidence=np.full(count, 0.9, dtype=np.float32),
+        class_id=np.array([i % 2 for i in range(count)], dtype=np.int16),
+        frames=frames,
+    )
+
+
+def _use_temp_database(directory):
+    """Trỏ repository vào DB tạm trong directory"""
+    from db.schema import create_tables
+    db.DB_PATH = os.path.join(directory, 'bench.db')
+    create_tables()
+
+
+def bench_clip_persist(args):
+    from core.clip_persistence import ClipPersister
+
+    clock, snapshot = _make_snapshot(args)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        _use_temp_database(directory)
+        for mode in ('jpeg', 'video'):
+            persister = ClipPersister(clock, CLASS_NAMES, mode=mode)
+
+            def persist(i):
+                folder = os.path.join(directory, f"{mode}_{i}")
+                persister.submit(snapshot, folder, 1, '20250101_000000', '20250101_000003').result()
+
+            durations = time_calls(persist, args.clip_iterations, warmup=1)
+            persister.close()
+            results[mode] = {**summarize_durations(durations), 'frames_per_clip': len(snapshot)}
+    return results
+
+
+def bench_drowsy_video(args):
+    from core.clip_persistence import ClipPersister
+    from utils.VideoManager import VideoManager
+
+    clock, snapshot = _make_snapshot(args)
+    manager = VideoManager()
+    # get_drowsy_video tách thư mục từ imageURL theo '/' như app (thư mục tương đối) -> dùng đường dẫn tương đối
+    with tempfile.TemporaryDirectory(dir='.') as directory:
+        _use_temp_database(directory)
+        persister = ClipPersister(clock, CLASS_NAMES, mode='jpeg')
+        folder = os.path.relpath(os.path.join(directory, 'clip'))
+        video_id = persister.submit(snapshot, folder, 1, '20250101_000000', '20250101_000003').result()
+        persister.close()
+        video_path = VideoManager.get_video_path(folder, video_id)
+
+        def rebuild(i):
+            # Xoá mp4 để get_drowsy_video dựng lại từ JPEG
+            if os.path.exists(video_path):
+                os.remove(video_path)
+            manager.get_drowsy_video(video_id)
+
+        def cached(i):
+            manager.get_drowsy_video(video_id)
+
+        return {
+            'rebuild_from_jpeg': summarize_durations(time_calls(rebuild, args.clip_iterations, warmup=1)),
+            'existing_video': summarize_durations(time_calls(cached, args.iterations)),
+            'frames_per_clip': len(snapshot),
+        }
+
+
+BENCHMARKS = {
+    'overlay': bench_overlay,
+    'drowsy_state': bench_drowsy_state,
+    'clip_persist': bench_clip_persist,
+    'drowsy_video': bench_drowsy_video,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark các bước của pipeline phát hiện buồn ngủ")
+    parser.add_argument('--only', type=lambda s: parse_list(s), default=list(BENCHMARKS),
+                        help=f"Chỉ chạy các benchmark ({', '.join(BENCHMARKS)})")
+    parser.add_argument('--resolution', type=parse_resolution, default=(640, 480))
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--clip-iterations', type=int, default=5)
+    parser.add_argument('--output', default='bench_results/micro.json')
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only:
+        print(f"▶️ {name}")
+        results[name] = BENCHMARKS[name](args)
+
+    config = {**vars(args), 'resolution': f"{args.resolution[0]}x{args.resolution[1]}"}
+    write_results(args.output, 'micro', results, config)
+
+
+if __name__ == '__main__':
+    main()
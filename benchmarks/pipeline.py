@@ -0,0 +1,126 @@
+"""
+Benchmark toàn pipeline DrowsinessDetector không cần camera
+
+Chạy DrowsinessDetector.process_frame trên frame giả lập (hoặc video ghi sẵn) theo mọi tổ hợp
+backend x batch size x độ phân giải, đo:
+    - FPS ổn định (frame đưa vào, frame được suy luận)
+    - độ trễ cảnh báo p50/p95/p99: từ lúc chụp frame tới khi kết quả của nó được áp dụng vào trạng thái cảnh báo
+    - RSS lớn nhất, bộ nhớ cấp phát ròng mỗi frame (tracemalloc)
+
+Ví dụ:
+    python -m benchmarks.pipeline --model model/model_1.pt --backends torch,onnx --batch-sizes 1,4,8 \\
+        --resolutions 640x480,1280x720 --output bench_results/pipeline.json
+"""
+import argparse
+import time
+import numpy as np
+from benchmarks.common import (measure_allocations, parse_list, parse_resolution, peak_rss_mb, recorded_frames,
+                               synthetic_frames, write_results)
+from core.telemetry import telemetry
+
+
+def run_case(args, backend, batch_size, resolution):
+    from core.DrowsinessDetector import DrowsinessDetector
+
+    width, height = resolution
+    frames = recorded_frames(args.video, width, height) if args.video else synthetic_frames(width, height)
+    work = np.empty_like(frames[0])  # camera trả frame mới mỗi lần; ở đây copy vào buffer cố định
+
+    telemetry.reset()
+    telemetry.enabled = True
+    detector = DrowsinessDetector(args.model, batch_size=batch_size, backend=backend,
+                                  adaptive_rate=False, face_roi=False)
+    # Không ghi clip / DB trong benchmark pipeline (đo riêng ở benchmarks.micro)
+    detector._request_save = lambda record: None
+
+    interval = 1.0 / args.fps if args.fps > 0 else 0.0
+
+    def feed(seconds):
+        count = 0
+        deadline = time.monotonic()
+        end = deadline + seconds
+        while time.monotonic() < end:
+            np.copyto(work, frames[count % len(frames)])
+            detector.process_frame(work)
+            count += 1
+            if interval:
+                deadline += interval
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        return count
+
+    try:
+        feed(args.warmup)
+        telemetry.reset()
+        started = time.perf_counter()
+        fed = feed(args.seconds)
+        elapsed = time.perf_counter() - started
+        snapshot = telemetry.snapshot()
+        latency = telemetry.histograms.get('latency.capture_to_result_ms')
+        counters = snapshot['counters']
+
+        def total(name):
+            return counters.get(name, {}).get('total', 0)
+
+        def allocation_step(i):
+            np.copyto(work, frames[i % len(frames)])
+            detector.process_frame(work)
+
+        allocations = measure_allocations(allocation_step, args.alloc_frames)
+
+        return {
+            'backend': backend,
+            'batch_size': batch_size,
+            'resolution': f"{width}x{height}",
+            'input_fps': fed / elapsed,
+            'inference_fps': total('inference.frames') / elapsed,
+            'alert_latency_ms': {
+                **{f"p{p}": latency.percentile(p) if latency else None for p in (50, 95, 99)},
+                # Mẫu âm / vượt phạm vi (không có trong percentile), khác 0 nghĩa là số đo độ trễ sai
+                'rejected': latency.negative + latency.overflow if latency else 0,
+            },
+            'process_frame_ms': snapshot['histograms'].get('detector.process_frame_ms'),
+            'inference_batch_ms': snapshot['histograms'].get('inference.batch_ms'),
+            'dropped_queue_full': total('frames.dropped_queue_full'),
+            'stale_results': total('inference.stale_results'),
+            'peak_rss_mb': peak_rss_mb(),  # đỉnh của cả tiến trình, tính cả các tổ hợp chạy trước
+            'allocations_per_frame': allocations,
+        }
+    finally:
+        detector.stop()
+        telemetry.enabled = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark toàn pipeline phát hiện buồn ngủ")
+    parser.add_argument('--model', required=True)
+    parser.add_argument('--backends', default='torch', type=lambda s: parse_list(s))
+    parser.add_argument('--batch-sizes', default='1,4,8', type=lambda s: parse_list(s, int))
+    parser.add_argument('--resolutions', default='640x480,1280x720', type=lambda s: parse_list(s, parse_resolution))
+    parser.add_argument('--video', help="Dùng frame từ video ghi sẵn thay cho frame giả lập")
+    parser.add_argument('--fps', type=float, default=30, help="Tốc độ đưa frame (0 = nhanh nhất có thể)")
+    parser.add_argument('--seconds', type=float, default=10, help="Thời gian đo mỗi tổ hợp")
+    parser.add_argument('--warmup', type=float, default=3, help="Thời gian chạy trước khi đo")
+    parser.add_argument('--alloc-frames', type=int, default=200, help="Số frame đo cấp phát bộ nhớ")
+    parser.add_argument('--output', default='bench_results/pipeline.json')
+    args = parser.parse_args()
+
+    results = []
+    for backend in args.backends:
+        for batch_size in args.batch_sizes:
+            for resolution in args.resolutions:
+                print(f"▶️ backend={backend} batch={batch_size} {resolution[0]}x{resolution[1]}")
+                result = run_case(args, backend, batch_size, resolution)
+                latency = result['alert_latency_ms']
+                print(f"   input {result['input_fps']:.1f} fps, inference {result['inference_fps']:.1f} fps, "
+                      f"latency p50/p95/p99 {latency['p50'] or 0:.1f}/{latency['p95'] or 0:.1f}/{latency['p99'] or 0:.1f} ms")
+                results.append(result)
+
+    config = {k: v for k, v in vars(args).items() if k != 'resolutions'}
+    config['resolutions'] = [f"{w}x{h}" for w, h in args.resolutions]
+    write_results(args.output, 'pipeline', results, config)
+
+
+if __name__ == '__main__':
+    main()
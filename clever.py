@@ -283,7 +283,6 @@ def get_latest_session_id(user_id: str) -> Optional[int]:
         
         row = cursor.fetchone()
         cursor.close()
-        conn.close()
         
         return row[0] if row else None
         
@@ -1,18 +1,23 @@
-import cv2
-import numpy as np
-from ultralytics import YOLO
-from collections import deque
 import time
 import sqlite3
-from datetime import datetime
 from pathlib import Path
 import threading
 import queue
-import os
+import traceback
+from concurrent.futures import wait
 import repository.drowsy_video_repo as drowsy_video_repo
-import repository.frame_repo as frame_repo
 import core.config as config
-from utils.VideoManager import VideoManager
+from core.inference_backend import create_backend
+from core.inference_worker import ProcessBackend
+from core.face_roi import FaceRoiTracker
+from core.adaptive_rate import AdaptiveRateController
+from core.alert_state import AlertStateMachine
+from core.scheduler import EventScheduler
+from core.overlay import OverlayRenderer
+from core.frame_record import FrameClock
+from core.frame_ring import FrameRingBuffer
+from core.telemetry import telemetry
+from core.clip_persistence import ClipPersister
 
 
 class DrowsinessDetector:
@@ -23,37 +28,99 @@ class DrowsinessDetector:
             batch_size: Số frame xử lý cùng lúc
             alert_threshold: Thời gian liên tục buồn ngủ (giây) trước khi cảnh báo
             callback: Hàm callback khi có cảnh báo (callback_func(frame, drowsy_ratio, avg_conf))
+            batch_timeout (kwargs): Thời gian tối đa (giây) chờ gom đủ batch sau frame đầu tiên
+            backend (kwargs): Backend suy luận 'torch' | 'onnx' | 'openvino'
+            fast_preprocess (kwargs): Tự tiền xử lý vào batch tensor cấp phát sẵn và gọi forward trực tiếp
+                (nhanh hơn, xác suất lệch nhẹ so với ultralytics; mặc định tắt)
+            process_worker (kwargs): Chạy model trong tiến trình riêng (tự khởi động lại khi crash)
+            face_roi (kwargs): Cắt vùng khuôn mặt trước khi phân loại
+            adaptive_rate (kwargs): Giảm tần suất phân loại khi tài xế tỉnh táo ổn định (mặc định tắt)
+            min_history_seconds (kwargs): Lịch sử phải phủ tối thiểu bấy nhiêu giây trước khi xét cảnh báo
+            deterministic (kwargs): Replay bản ghi: xử lý mọi frame, quyết định chỉ phụ thuộc timestamp frame
         """
-        self.model = YOLO(model_path)
+        detector_config = config.config.get('detector', {})
+        backend = kwargs.get("backend", detector_config.get('backend', 'torch'))
+        if kwargs.get("process_worker", detector_config.get('process_worker', False)):
+            # Suy luận trong tiến trình riêng, frame truyền qua shared memory
+            self.backend = ProcessBackend(model_path, backend=backend, batch_size=batch_size)
+        else:
+            self.backend = create_backend(
+                model_path,
+                backend=backend,
+                batch_size=batch_size,
+                fast_preprocess=kwargs.get("fast_preprocess", detector_config.get('fast_preprocess', False)),
+            )
         self.batch_size = batch_size
         self.alert_threshold = alert_threshold
         self.callback = callback
 
-        self.drowsy_history = deque(maxlen=int(30 * alert_threshold)) # Lịch sử phát hiện buồn ngủ
-        self.confidence_history = deque(maxlen=int(30 * alert_threshold)) # confidence score tương ứng với các lần ghi nhận trong hàng đợi drowsy history phía trên
-        # Lưu trữ kết quả phân loại gần đây
-        self.drowsy_history = deque(maxlen=int(30 * alert_threshold))
-        self.natural_history = deque(maxlen=int(30 * alert_threshold))
-        self.confidence_history = deque(maxlen=int(30 * alert_threshold))
-
-        self.alert_active = False
-        self.alert_start_time = None
-        self.last_alert_time = 0 # Lần cuối cùng alert
-        self.alert_cooldown = 10
+        # Lịch sử kết quả (cửa sổ alert_threshold giây theo thời gian chụp frame) + trạng thái cảnh báo / cooldown
+        self.alerts = AlertStateMachine(
+            alert_threshold,
+            # Cửa sổ phải phủ tối thiểu bấy nhiêu giây mới bắt đầu xét cảnh báo
+            min_history_seconds=kwargs.get("min_history_seconds", detector_config.get('min_history_seconds', 1.0)),
+        )
 
         # Trạng thái khởi tạo
         self.current_class = "Unknown"
         self.current_confidence = 0.0
         self.drowsy_ratio = 0.0
 
-        self.processing_queue = queue.Queue(maxsize=30) # Hàng đợi cho (idx, frame)
-        self.result_queue = queue.Queue(maxsize=30) # hàng kết quả (rs - frame)
-        self.frame_queue = queue.Queue(maxsize=90) # hàng đợi - (rs - frame) phục vụ cho lưu trữ
-        self.is_save_img = False # Quyết định lưu frame hình
-        self.current_frame_id = None # Frame id hiện tại
-        self.last_frame_id = None # frame id cuối trước đó
+        self.clock = FrameClock() # Cấp FrameRecord (seq, monotonic ns) cho từng frame
+        self._processed = threading.Condition()
+        self._processed_seq = -1
+        self._queued_seq = -1
+        self._flush_seq = -1 # flush() đang chờ tới frame này (-1: không chờ): batch cuối được gửi dù chưa đủ batch_size
+        self._queued_since_flush = 0
+        self.processing_queue = queue.Queue(maxsize=30) # Hàng đợi cho (record, slot trong frame_ring)
+        self.result_queue = queue.Queue(maxsize=30) # hàng kết quả (record, rs)
+        # Replay deterministic: không bỏ frame / kết quả, batch luôn đủ batch_size, kết quả chỉ được áp dụng trong flush()
+        self.deterministic = kwargs.get("deterministic", False)
+        self.clip_length = 90 # Số frame đã phân loại gần nhất được lưu khi có sự kiện
+        # Ring buffer cấp phát sẵn giữ frame đưa vào model: đủ cho clip + các frame đang chờ/đang suy luận
+        self.frame_ring = FrameRingBuffer(self.clip_length + self.processing_queue.maxsize + batch_size)
+        self.save_pending = False # Đã lên lịch lưu frame hình, chưa chạy
+        self.save_min_interval = 1.0 # Khoảng cách tối thiểu (giây) giữa 2 lần lưu
+        self.last_save_time = float('-inf')
+        self._pending_saves = set() # Future của các clip đang lưu, stop() chờ hết trước khi đóng
+        self._pending_lock = threading.Lock()
+        self.current_record = None # FrameRecord của frame kích hoạt lưu / cảnh báo gần nhất
         self.session_id = kwargs.get("session_id") # Phiên làm việc
 
+        # Micro-batching: chờ frame đầu tiên, sau đó gom tiếp tới khi đủ batch hoặc hết hạn
+        self.batch_timeout = kwargs.get("batch_timeout", detector_config.get('batch_timeout_ms', 5) / 1000)
+
+        # Cắt vùng khuôn mặt (tuỳ chọn) trước khi đưa vào model
+        roi_config = detector_config.get('face_roi', {})
+        self.face_roi = None
+        if kwargs.get("face_roi", roi_config.get('enabled', False)):
+            self.face_roi = FaceRoiTracker(
+                detect_interval=roi_config.get('detect_interval', 10),
+                margin=roi_config.get('margin', 0.25),
+            )
+
+        # Điều chỉnh tần suất phân loại (tuỳ chọn)
+        rate_config = detector_config.get('adaptive_rate', {})
+        self.rate_controller = None
+        if kwargs.get("adaptive_rate", rate_config.get('enabled', False)):
+            self.rate_controller = AdaptiveRateController(
+                low_fps=rate_config.get('low_fps', 5),
+                max_ramp_latency=rate_config.get('max_ramp_latency_ms', 200) / 1000,
+                ramp_drowsy_ratio=rate_config.get('ramp_drowsy_ratio', 0.1),
+                ramp_confidence_variance=rate_config.get('ramp_confidence_variance', 0.02),
+                hold_seconds=rate_config.get('hold_seconds', 5),
+            )
+
+        self.batch_stats = {
+            'batches': 0,
+            'last_fill_ratio': 0.0,
+            'avg_fill_ratio': 0.0,
+            'last_queue_wait_ms': 0.0,
+            'avg_queue_wait_ms': 0.0,
+        }
+
+        self.overlay = OverlayRenderer()
+
         # load các config: model - path image - camera
         self.drowsy_path = config.config.get('drowsy_image_path', 'drowsy_images')
         Path(self.drowsy_path).mkdir(exist_ok=True)
@@ -62,100 +129,283 @@ class DrowsinessDetector:
         self.running = True
         self.thread = threading.Thread(target=self._processing_loop, daemon=True) 
         self.thread.start()
-        # Thread lưu ảnh video
-        self.video_manager = VideoManager()
-        self.img_thread = threading.Thread(target=self._save_img, daemon=True)
-        self.img_thread.start()
+        # Lưu clip (JPEG + DB + mp4) trên pool riêng, scheduler chỉ lấy snapshot rồi chuyển giao
+        self.persister = ClipPersister(
+            self.clock, self.backend.names,
+            max_workers=kwargs.get('persist_workers', detector_config.get('persist_workers', 4)),
+            video_fps=config.config.get('camera', {}).get('fps', 30.0),
+            mode=kwargs.get('clip_mode', detector_config.get('clip_mode', 'jpeg')),
+        )
+        # Scheduler hẹn giờ lưu ảnh video (gộp các yêu cầu lưu liên tiếp)
+        self.scheduler = EventScheduler(name="DrowsinessScheduler")
+        # Ghi telemetry ra file JSON định kỳ (nếu bật trong config)
+        telemetry.start_dump()
+
+    @property
+    def deterministic(self):
+        return self._deterministic
+
+    @deterministic.setter
+    def deterministic(self, value):
+        self._deterministic = value
+        # Replay: hàng kết quả không giới hạn để không bao giờ bỏ kết quả (batch có thể lớn hơn 30)
+        with self.result_queue.mutex:
+            self.result_queue.maxsize = 0 if value else 30
+
+    @property
+    def alert_active(self):
+        return self.alerts.alert_active
+
+    @property
+    def current_frame_id(self):
+        """Định danh giờ thực ('YYYYMMDD_HHMMSS') của frame kích hoạt gần nhất, khớp với endTime trong DB"""
+        if self.current_record is None:
+            return None
+        return self.clock.format(self.current_record.ts_ns)
+
+    def _request_save(self, record):
+        """Lên lịch lưu các frame gần nhất, gộp các yêu cầu tới dồn dập thành một lần lưu"""
+        self.current_record = record
+        if self.save_pending:
+            return
+        self.save_pending = True
+        delay = self.last_save_time + self.save_min_interval - time.monotonic()
+        self.scheduler.call_later(delay, self._save_img)
 
     def _save_img(self):
-        """Lưu ảnh cảnh báo"""
+        """
+        Chụp các frame gần nhất và chuyển cho ClipPersister (chạy trên scheduler)
+        Returns: Future -> drowsyVideoID, hoàn thành khi clip và các dòng Frame đã ghi bền (None nếu chưa có frame)
+        """
+        self.save_pending = False
+        self.last_save_time = time.monotonic()
+        start = time.perf_counter()
+        snapshot = self.frame_ring.snapshot(self.clip_length)
+        telemetry.record_since('persist.snapshot_ms', start)
+        if not snapshot:
+            return
+
+        # Chỉ quy đổi sang giờ thực tại bước lưu trữ: clip bắt đầu ở frame cũ nhất trong buffer
+        timestamp = self.clock.format(self.current_record.ts_ns)
+        start_time = self.clock.format(int(snapshot.ts_ns[0]))
+        video_frame_id = f"{self.drowsy_path}/drowsy_{timestamp}_sessionID={self.session_id}"
+        future = self.persister.submit(snapshot, video_frame_id, self.session_id, start_time, timestamp)
+        with self._pending_lock:
+            self._pending_saves.add(future)
+        future.add_done_callback(self._on_save_done)
+        telemetry.count('persist.clips')
+        return future
+
+    def _on_save_done(self, future):
+        with self._pending_lock:
+            self._pending_saves.discard(future)
+        error = future.exception()
+        if error is not None:
+            print(f"⚠️ Lỗi khi lưu clip cảnh báo: {error}")
+            traceback.print_exception(type(error), error, error.__traceback__)
+            telemetry.count('persist.errors')
+
+    def _collect_batch(self):
+        """
+        Gom một batch frame từ processing_queue
+        Chặn tới khi có frame đầu tiên, sau đó gom tiếp cho tới khi đủ batch_size hoặc hết batch_timeout
+        Returns: (records, slots) - rỗng nếu detector đã dừng
+        """
+        if self.deterministic:
+            return self._collect_full_batch()
+        records, slots = [], []
+
+        # Chờ frame đầu tiên (timeout ngắn để còn kiểm tra self.running)
         while self.running:
-            time.sleep(1)
-            if self.is_save_img:
-                timestamp = self.current_frame_id
-                last_id = self.last_frame_id
-                video_frame_id = f"{self.drowsy_path}/drowsy_{timestamp}_sessionID={self.session_id}"
-                os.makedirs(video_frame_id, exist_ok=True)
-                drowsyVideoID = drowsy_video_repo.create_drowsy_video(self.session_id, last_id, timestamp)
-                
-                for i, (idx, _, confidence, class_name, frame) in enumerate(list(self.frame_queue.queue.copy())):
-                    url_img = f"{video_frame_id}/frame_idx={idx}_{i}_confidence={confidence}_class={class_name}.jpg"
-                    cv2.imwrite(url_img, frame)
-                    frame_repo.insert_frame(drowsyVideoID, confidence, class_name.lower() == 'drowsy', url_img)
-                self.video_manager.get_drowsy_video(drowsyVideoID)
-                self.is_save_img = False
+            try:
+                record, slot = self.processing_queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        else:
+            return records, slots
+
+        records.append(record)
+        slots.append(slot)
+
+        # Gom thêm cho tới khi đủ batch hoặc hết hạn
+        deadline = time.perf_counter() + self.batch_timeout
+        while len(slots) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                record, slot = self.processing_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            records.append(record)
+            slots.append(slot)
+
+        return records, slots
+
+    def _collect_full_batch(self):
+        """
+        Gom batch cho replay deterministic: không dùng batch_timeout, chờ đủ batch_size
+        (hoặc tới frame mà flush() đang chờ) để thành phần batch không phụ thuộc thời gian
+        """
+        records, slots = [], []
+        while self.running and len(slots) < self.batch_size:
+            if records and records[-1].seq >= self._flush_seq >= 0:
+                break
+            try:
+                record, slot = self.processing_queue.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            records.append(record)
+            slots.append(slot)
+        if not self.running:
+            return [], []
+        return records, slots
+
+    def _record_batch_stats(self, records):
+        """
+        Cập nhật thống kê batch: tỷ lệ lấp đầy và thời gian chờ trong hàng đợi
+        Thời gian chờ tính từ arrival_ns (lúc vào pipeline), không từ ts_ns: khi replay ts_ns là vị trí trong bản ghi
+        """
+        now_ns = time.monotonic_ns()
+        batch_len = len(records)
+        fill_ratio = batch_len / self.batch_size
+        queue_wait_ms = sum(now_ns - r.arrival_ns for r in records) / batch_len / 1e6
+
+        stats = self.batch_stats
+        alpha = 0.1 if stats['batches'] else 1.0  # EMA, batch đầu tiên lấy luôn giá trị
+        stats['batches'] += 1
+        stats['last_fill_ratio'] = fill_ratio
+        stats['last_queue_wait_ms'] = queue_wait_ms
+        stats['avg_fill_ratio'] += alpha * (fill_ratio - stats['avg_fill_ratio'])
+        stats['avg_queue_wait_ms'] += alpha * (queue_wait_ms - stats['avg_queue_wait_ms'])
+
+    def get_telemetry(self):
+        """Snapshot số đo hiệu năng (histogram độ trễ, bộ đếm, kích thước hàng đợi)"""
+        return telemetry.snapshot()
+
+    def get_batch_stats(self):
+        """Lấy thống kê micro-batching (fill ratio, queue wait)"""
+        return dict(self.batch_stats)
 
     def _processing_loop(self):
         """Luồng riêng xử lý YOLO"""
         while self.running:
-            frames = []
-            frame_indices = []
-
             # Thu thập batch frames
-            while len(frames) < self.batch_size and not self.processing_queue.empty():
-                try:
-                    idx, frame = self.processing_queue.get(timeout=0.01)
-                    frames.append(frame)
-                    frame_indices.append(idx)
-                except queue.Empty:
-                    break
-
-            if not frames:
-                time.sleep(0.01)
+            records, slots = self._collect_batch()
+            if not slots:
                 continue
+            self._record_batch_stats(records)
 
-            # Xử lý batch
-            results = self.model(frames, verbose=False)
+            # Đọc frame trực tiếp từ ring buffer (view, không copy)
+            frames = [self.frame_ring.frames[slot] for slot in slots]
 
-            # Lấy kết quả ứng với idx ban đầu
-            for idx, result in zip(frame_indices, results):
+            # Xử lý batch (trên vùng khuôn mặt nếu bật face_roi)
+            inputs = [self.face_roi.crop(frame) for frame in frames] if self.face_roi else frames
+            start = time.perf_counter()
+            try:
+                class_ids, confidences = self.backend.predict(inputs)
+            except Exception as e:
+                print(f"⚠️ Lỗi suy luận, bỏ qua batch: {e}")
+                telemetry.count('inference.errors')
+                self._mark_processed(records[-1].seq)
+                continue
+            telemetry.record_since('inference.batch_ms', start)
+            telemetry.record('inference.batch_size', len(slots))
+            telemetry.count('inference.frames', len(slots))
+            if telemetry.enabled:
+                done_ns = time.monotonic_ns()
+                for record in records:
+                    telemetry.record('latency.capture_to_inference_ms', (done_ns - record.arrival_ns) / 1e6)
+
+            # Lấy kết quả ứng với record ban đầu
+            for record, slot, class_id, confidence in zip(records, slots, class_ids, confidences):
                 # Lấy class và confidence
-                class_id = result.probs.top1
-                class_name = result.names[class_id]
-                confidence = result.probs.top1conf.item()
+                class_name = self.backend.names[int(class_id)]
+                confidence = float(confidence)
 
                 # Kiểm tra nếu là Drowsy
                 is_drowsy = class_name.lower() == 'drowsy'
 
-                # Đưa kết quả vào result_queue
+                # Ghi kết quả vào ring buffer (bỏ qua nếu slot đã bị ghi đè trong lúc suy luận)
+                if not self.frame_ring.set_result(slot, record.seq, class_id, confidence):
+                    telemetry.count('inference.stale_results')
+                    continue
+
+                # Đưa kết quả vào result_queue (replay: hàng không giới hạn, không bao giờ Full)
                 try:
-                    self.result_queue.put_nowait((idx, is_drowsy, confidence, class_name, result.orig_img))
-                    if self.frame_queue.full():
-                        self.last_frame_id = self.frame_queue.get_nowait()[0] # lấy ra frame xử lý sớm nhất mà chưa được xuất hình
-                    self.frame_queue.put_nowait((idx, is_drowsy, confidence, class_name, result.orig_img.copy()))
+                    self.result_queue.put_nowait((record, is_drowsy, confidence, class_name))
                 except queue.Full:
-                    if self.result_queue.full():
-                        self.result_queue.get_nowait()
-                    else:
-                        self.frame_queue.get_nowait()
+                    telemetry.count('results.dropped')
+                    try:
+                        self.result_queue.get_nowait() # bỏ kết quả cũ nhất chưa được xử lý
+                        self.result_queue.put_nowait((record, is_drowsy, confidence, class_name))
+                    except (queue.Empty, queue.Full):
+                        pass
+
+            self._mark_processed(records[-1].seq)
+
+    def _mark_processed(self, seq):
+        """Báo cho flush() biết các frame tới seq đã xử lý xong"""
+        with self._processed:
+            self._processed_seq = seq
+            self._processed.notify_all()
     
     # Tiến trình gửi các frame hình vào hàng đợi xử lý + xử lý hàng đợi đã qua model, vẽ lên ảnh thông số hiển thị
-    def process_frame(self, frame):
+    def process_frame(self, frame, ts_ns=None):
         """
         Xử lý một frame
+        Overlay được vẽ trực tiếp lên frame truyền vào
+        ts_ns: thời điểm chụp frame (time.monotonic_ns()), mặc định là lúc gọi hàm
         Returns: (processed_frame, status_dict)
         """
-        # Gửi frame vào queue xử lý
-        id = datetime.now().strftime("%Y%m%d_%H%M%S")
-        if not self.processing_queue.full():
+        # Gửi frame vào queue xử lý (bỏ qua nếu bộ điều chỉnh tần suất chưa cần frame mới)
+        started = time.perf_counter()
+        record = self.clock.next(ts_ns)
+        now = record.timestamp
+        sample = self.rate_controller is None or self.rate_controller.should_sample(now)
+        if self.deterministic:
+            # Replay: không bỏ frame; cứ đủ một batch thì chờ kết quả trước khi nhận frame tiếp theo,
+            # để quyết định lấy mẫu / cảnh báo chỉ phụ thuộc vào nội dung bản ghi
+            if sample:
+                slot = self.frame_ring.write(record, frame)
+                self._queued_seq = record.seq
+                self.processing_queue.put((record, slot))
+                self._queued_since_flush += 1
+                if self._queued_since_flush >= self.batch_size:
+                    self.flush()
+        elif sample and not self.processing_queue.full():
             try:
-                self.processing_queue.put_nowait((id, frame.copy()))
+                slot = self.frame_ring.write(record, frame)
+                self.processing_queue.put_nowait((record, slot))
             except queue.Full:
-                pass
-        # Nhận kết quả từ queue
-        try:
-            while not self.result_queue.empty():
-                idx, is_drowsy, confidence, class_name, _ = self.result_queue.get_nowait()
-                self._update_drowsy_state(idx, is_drowsy, confidence, class_name, frame)
-        except queue.Empty:
-            pass
+                telemetry.count('frames.dropped_queue_full')
+        elif sample:
+            telemetry.count('frames.dropped_queue_full')
+        else:
+            telemetry.count('frames.skipped_rate')
+        telemetry.count('frames.processed')
+        telemetry.gauge('queue.processing', self.processing_queue.qsize())
+        telemetry.gauge('queue.result', self.result_queue.qsize())
+        self.alerts.tick(now)
+        # Nhận kết quả từ queue (replay: chỉ áp dụng trong flush(), tại ranh giới batch cố định)
+        if not self.deterministic:
+            self._drain_results(frame)
 
         # Tính toán các thông số
-        self.drowsy_ratio = sum(self.drowsy_history) / len(self.drowsy_history) if self.drowsy_history else 0
-        avg_conf = np.mean(list(self.confidence_history)) if self.confidence_history else 0
+        self.drowsy_ratio = self.alerts.drowsy_ratio
+        avg_conf = self.alerts.avg_confidence
 
-        # Vẽ overlay
-        frame_display = self._draw_overlay(frame.copy(), self.drowsy_ratio, avg_conf)
+        if self.rate_controller is not None:
+            self.rate_controller.update(
+                now, self.drowsy_ratio, self.alerts.confidence_history.variance,
+                # Lịch sử chưa đủ / đang đếm thời gian cảnh báo / frame mới nhất là drowsy -> full rate
+                force_full_rate=(not self.alerts.history_ready() or self.alerts.alert_start_time is not None
+                                 or self.current_class.lower() == 'drowsy'),
+            )
+
+        # Vẽ overlay trực tiếp lên frame (frame_ring đã giữ bản copy riêng)
+        frame_display = self._draw_overlay(frame, self.drowsy_ratio, avg_conf)
 
         # Trả về frame và status
         status = {
@@ -166,100 +416,84 @@ class DrowsinessDetector:
             'alert_progress': self._get_alert_progress()
         }
 
+        telemetry.record_since('detector.process_frame_ms', started)
         return frame_display, status
 
-    def _update_drowsy_state(self, idx, is_drowsy, confidence, class_name, frame):
-        """Cập nhật trạng thái buồn ngủ"""
+    def _drain_results(self, frame):
+        """Áp dụng các kết quả đã có vào trạng thái buồn ngủ"""
+        try:
+            while not self.result_queue.empty():
+                result_record, is_drowsy, confidence, class_name = self.result_queue.get_nowait()
+                if telemetry.enabled:
+                    telemetry.record('latency.capture_to_result_ms', (time.monotonic_ns() - result_record.arrival_ns) / 1e6)
+                self._update_drowsy_state(result_record, is_drowsy, confidence, class_name, frame)
+        except queue.Empty:
+            pass
+
+    def flush(self, timeout=30):
+        """
+        Chờ mọi frame đã đưa vào hàng đợi có kết quả rồi áp dụng (dùng cho replay deterministic)
+        Returns: True nếu mọi frame đã có kết quả trong timeout
+        """
+        with self._processed:
+            self._flush_seq = self._queued_seq
+            done = self._processed.wait_for(lambda: self._processed_seq >= self._queued_seq or not self.running, timeout)
+            self._flush_seq = -1
+        self._queued_since_flush = 0
+        self._drain_results(None)
+        return done
+
+    def _update_drowsy_state(self, record, is_drowsy, confidence, class_name, frame):
+        """
+        Cập nhật trạng thái buồn ngủ
+        record: FrameRecord của frame - mọi cửa sổ/thời gian đều tính theo thời điểm chụp frame
+        """
         self.current_class = class_name
         self.current_confidence = confidence
-        self.drowsy_history.append(int(is_drowsy))
-        self.natural_history.append(int(not is_drowsy))
-        self.confidence_history.append(confidence)
-
-        # Tính tỷ lệ drowsy trong lịch sử gần đây
-        if len(self.drowsy_history) >= 30:
-            drowsy_ratio = sum(self.drowsy_history) / len(self.drowsy_history)
-            avg_conf = np.mean(list(self.confidence_history))
-
-            current_time = time.time()
-
-            # Kiểm tra điều kiện cảnh báo
-            if drowsy_ratio > 0.7 and not self.alert_active:
-                if self.alert_start_time is None:
-                    self.alert_start_time = current_time
-
-                # Nếu đã buồn ngủ liên tục đủ lâu
-                elapsed = current_time - self.alert_start_time
-                if elapsed >= self.alert_threshold:
-                    # Kiểm tra cooldown
-                    if current_time - self.last_alert_time > self.alert_cooldown:
-                        self.current_frame_id = idx
-                        self.is_save_img = True
-                        self._trigger_alert(frame, drowsy_ratio, avg_conf)
-                        self.last_alert_time = current_time
-            else:
-                # Reset nếu không còn buồn ngủ
-                if drowsy_ratio <= 0.5:
-                    self.alert_start_time = None
-                natural_ratio = sum(self.natural_history) / len(self.natural_history)
-                avg_conf = np.mean(list(self.confidence_history))
-                if natural_ratio > 0.8 and avg_conf > 0.8:
-                    self.current_frame_id = idx
-                    self.is_save_img = True
-                    print("✅ Người dùng tỉnh táo, đã lưu trạng thái.")
+        event = self.alerts.update(record.timestamp, is_drowsy, confidence)
+
+        if event == AlertStateMachine.ALERT:
+            self._request_save(record)
+            self._trigger_alert(frame, self.alerts.drowsy_ratio, self.alerts.avg_confidence)
+        elif event == AlertStateMachine.NATURAL:
+            self._request_save(record)
+            print("✅ Người dùng tỉnh táo, đã lưu trạng thái.")
 
     def _trigger_alert(self, frame, drowsy_ratio, avg_conf):
-        """Kích hoạt cảnh báo"""
+        """Kích hoạt cảnh báo (thời gian giữ alert_active và cooldown do AlertStateMachine tính theo timestamp frame)"""
 
         # Gọi callback nếu có
         if self.callback:
-            self.callback(frame.copy(), drowsy_ratio, avg_conf)
-
-        # Reset trạng thái sau 2 giây
-        def reset_alert():
-            time.sleep(2)
-            self.alert_active = False
-
-        threading.Thread(target=reset_alert, daemon=True).start()
+            self.callback(frame.copy() if frame is not None else None, drowsy_ratio, avg_conf)
 
     def _get_alert_progress(self):
         """Lấy tiến trình cảnh báo (0-1)"""
-        #   
-        if self.alert_start_time is None:
-            return 0.0
-        elapsed = time.time() - self.alert_start_time
-        return min(elapsed / self.alert_threshold, 1.0)
+        return self.alerts.progress()
 
     def _draw_overlay(self, frame, drowsy_ratio, avg_conf):
-        """Vẽ overlay lên frame"""
-        # Background cho text
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, 0), (400, 150), (0, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.6, frame, 0.4, 0, frame)
-
+        """Vẽ overlay lên frame (in-place, chỉ blend vùng 400x150 góc trên trái)"""
+        start = time.perf_counter()
         # Trạng thái hiện tại
         status_text = "DROWSY ⚠️" if self.alert_active else self.current_class
         status_color = (0, 0, 255) if self.alert_active else (0, 255, 0)
 
-        cv2.putText(frame, f"Status: {status_text}", (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, status_color, 2)
-
-        # Confidence
-        cv2.putText(frame, f"Confidence: {self.current_confidence * 100:.1f}%", (10, 60),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
         # Drowsy ratio
         ratio_color = (0, 0, 255) if drowsy_ratio > 0.7 else (0, 165, 255) if drowsy_ratio > 0.3 else (0, 255, 0)
-        cv2.putText(frame, f"Drowsy Ratio: {drowsy_ratio * 100:.1f}%", (10, 90),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, ratio_color, 2)
+
+        texts = [
+            (f"Status: {status_text}", (10, 30), 0.8, status_color),
+            (f"Confidence: {self.current_confidence * 100:.1f}%", (10, 60), 0.6, (255, 255, 255)),
+            (f"Drowsy Ratio: {drowsy_ratio * 100:.1f}%", (10, 90), 0.6, ratio_color),
+        ]
 
         # Progress bar
         progress = self._get_alert_progress()
+        progress_bar = None
         if progress > 0:
-            bar_width = int(380 * progress)
-            cv2.rectangle(frame, (10, 110), (10 + bar_width, 130), (0, 140, 255), -1)
-            cv2.rectangle(frame, (10, 110), (390, 130), (255, 255, 255), 2)
+            progress_bar = (10, 110, 380, 20, int(380 * progress), (0, 140, 255), (255, 255, 255))
 
+        frame = self.overlay.draw(frame, texts, progress_bar)
+        telemetry.record_since('overlay.draw_ms', start)
         return frame
 
     def get_latest_alerts(self, limit=50):
@@ -280,8 +514,21 @@ class DrowsinessDetector:
     def stop(self):
         """Dừng detector"""
         self.running = False
+        with self._processed:
+            self._processed.notify_all()
         if self.thread.is_alive():
             self.thread.join(timeout=2)
-        if self.img_thread.is_alive():
-            self.img_thread.join(timeout=2)
+        self.scheduler.stop()
+        # Lần lưu đã hẹn giờ nhưng chưa chạy (scheduler bỏ khi dừng): lưu ngay để không mất clip cuối phiên
+        if self.save_pending:
+            self._save_img()
+        # Không còn clip mới; chờ các clip đang lưu ghi xong
+        with self._pending_lock:
+            pending = list(self._pending_saves)
+        if pending:
+            print(f"💾 Đang chờ lưu {len(pending)} clip cảnh báo...")
+            wait(pending)
+        self.persister.close()
+        self.backend.close()
+        telemetry.stop_dump()
         # self.conn.close()
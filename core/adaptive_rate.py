@@ -0,0 +1,44 @@
+class AdaptiveRateController:
+    """
+    Điều chỉnh tần suất đưa frame vào model theo trạng thái tài xế
+    - Lịch sử gần đây "sạch" (ít drowsy, confidence ổn định): chỉ phân loại low_fps frame/giây
+    - Có dấu hiệu buồn ngủ hoặc confidence dao động: phân loại mọi frame trong ít nhất hold_seconds
+    Độ trễ tối đa trước khi tăng tốc bị chặn bởi max_ramp_latency (khoảng cách giữa 2 frame ở chế độ chậm).
+    """
+
+    def __init__(self, low_fps=5, max_ramp_latency=0.2, ramp_drowsy_ratio=0.1,
+                 ramp_confidence_variance=0.02, hold_seconds=5.0):
+        """
+        Args:
+            low_fps: Tần suất phân loại khi tài xế tỉnh táo ổn định
+            max_ramp_latency: Độ trễ tối đa (giây) từ lúc có frame buồn ngủ tới lúc nó được phân loại
+            ramp_drowsy_ratio: Ngưỡng drowsy ratio để chuyển sang full rate
+            ramp_confidence_variance: Ngưỡng phương sai confidence để chuyển sang full rate
+            hold_seconds: Thời gian giữ full rate sau lần cuối có dấu hiệu bất thường
+        """
+        self.low_interval = min(1.0 / low_fps, max_ramp_latency)
+        self.ramp_drowsy_ratio = ramp_drowsy_ratio
+        self.ramp_confidence_variance = ramp_confidence_variance
+        self.hold_seconds = hold_seconds
+
+        self.full_rate_until = float('inf')  # full rate cho tới khi có đủ lịch sử
+        self.last_sample_time = None
+
+    def should_sample(self, now):
+        """Quyết định có đưa frame tại thời điểm now vào model hay không"""
+        if (now < self.full_rate_until or self.last_sample_time is None
+                or now - self.last_sample_time >= self.low_interval):
+            self.last_sample_time = now
+            return True
+        return False
+
+    def update(self, now, drowsy_ratio, confidence_variance, force_full_rate=False):
+        """
+        Cập nhật trạng thái sau khi có kết quả phân loại mới
+        force_full_rate: giữ full rate (vd: lịch sử chưa đủ, đang đếm thời gian cảnh báo)
+        """
+        if (force_full_rate or drowsy_ratio >= self.ramp_drowsy_ratio
+                or confidence_variance >= self.ramp_confidence_variance):
+            self.full_rate_until = now + self.hold_seconds
+        elif self.full_rate_until == float('inf'):
+            self.full_rate_until = now
@@ -0,0 +1,107 @@
+from core.window_stats import TimeWindowStats
+
+
+class AlertStateMachine:
+    """
+    Trạng thái cảnh báo buồn ngủ của một luồng camera, chỉ phụ thuộc vào timestamp của frame
+    Không dùng thread / hẹn giờ: thời gian giữ cảnh báo và cooldown được so với timestamp frame mới nhất,
+    nên cùng một chuỗi kết quả luôn cho cùng một chuỗi sự kiện (chạy realtime, replay hay chấm điểm offline).
+    """
+
+    ALERT = 'alert'  # Đủ điều kiện cảnh báo buồn ngủ
+    NATURAL = 'natural'  # Tỉnh táo ổn định (dùng để lưu mẫu natural)
+
+    def __init__(self, alert_threshold=3, min_history_seconds=1.0, alert_ratio=0.7, reset_ratio=0.5,
+                 natural_ratio=0.8, natural_confidence=0.8, alert_reset_delay=2, alert_cooldown=10):
+        """
+        Args:
+            alert_threshold: Thời gian (giây) buồn ngủ liên tục trước khi cảnh báo, cũng là độ dài cửa sổ lịch sử
+            min_history_seconds: Lịch sử phải phủ tối thiểu bấy nhiêu giây trước khi xét cảnh báo
+            alert_ratio: Tỷ lệ drowsy trong cửa sổ để bắt đầu đếm thời gian cảnh báo
+            reset_ratio: Tỷ lệ drowsy dưới mức này thì huỷ đếm thời gian
+            natural_ratio / natural_confidence: Ngưỡng coi là tỉnh táo ổn định
+            alert_reset_delay: Thời gian giữ trạng thái alert_active
+            alert_cooldown: Thời gian chờ giữa 2 lần cảnh báo
+        """
+        self.alert_threshold = alert_threshold
+        self.min_history_seconds = min_history_seconds
+        self.alert_ratio = alert_ratio
+        self.reset_ratio = reset_ratio
+        self.natural_ratio = natural_ratio
+        self.natural_confidence = natural_confidence
+        self.alert_reset_delay = alert_reset_delay
+        self.alert_cooldown = alert_cooldown
+
+        self.drowsy_history = TimeWindowStats(alert_threshold)  # 1 = drowsy
+        self.confidence_history = TimeWindowStats(alert_threshold)
+        self.alert_start_time = None
+        self.last_alert_time = float('-inf')
+        self.last_result_time = None  # timestamp của frame mới nhất đã có kết quả
+        self.now = float('-inf')  # timestamp mới nhất đã biết (kết quả hoặc tick)
+
+    @property
+    def alert_active(self):
+        return self.now < self.last_alert_time + self.alert_reset_delay
+
+    @property
+    def in_cooldown(self):
+        return self.now < self.last_alert_time + self.alert_cooldown
+
+    @property
+    def drowsy_ratio(self):
+        return self.drowsy_history.ratio
+
+    @property
+    def avg_confidence(self):
+        return self.confidence_history.mean
+
+    def history_ready(self):
+        """Lịch sử đã phủ đủ thời gian tối thiểu để xét cảnh báo"""
+        return self.drowsy_history.span >= self.min_history_seconds
+
+    def tick(self, timestamp):
+        """Cập nhật thời điểm hiện tại khi chưa có kết quả mới (để alert_active / cooldown hết hạn đúng lúc)"""
+        if timestamp > self.now:
+            self.now = timestamp
+
+    def update(self, timestamp, is_drowsy, confidence):
+        """
+        Đưa một kết quả phân loại vào
+        Returns: ALERT, NATURAL hoặc None
+        """
+        self.tick(timestamp)
+        self.last_result_time = timestamp
+        self.drowsy_history.push(timestamp, int(is_drowsy))
+        self.confidence_history.push(timestamp, confidence)
+
+        if not self.history_ready():
+            return None
+
+        drowsy_ratio = self.drowsy_history.ratio
+        avg_conf = self.confidence_history.mean
+
+        # Xét theo timestamp của chính kết quả này (không theo tick mới hơn) để quyết định không phụ thuộc
+        # vào lúc kết quả được lấy ra khỏi hàng đợi
+        since_alert = timestamp - self.last_alert_time
+        if drowsy_ratio > self.alert_ratio and since_alert >= self.alert_reset_delay:
+            if self.alert_start_time is None:
+                self.alert_start_time = timestamp
+
+            # Đã buồn ngủ liên tục đủ lâu và không trong cooldown
+            if timestamp - self.alert_start_time >= self.alert_threshold and since_alert >= self.alert_cooldown:
+                self.last_alert_time = timestamp
+                return self.ALERT
+            return None
+
+        if drowsy_ratio <= self.reset_ratio:
+            self.alert_start_time = None
+        if 1 - drowsy_ratio > self.natural_ratio and avg_conf > self.natural_confidence:
+            return self.NATURAL
+        return None
+
+    def progress(self):
+        """Tiến trình cảnh báo (0-1)"""
+        if self.alert_start_time is None:
+            return 0.0
+        elapsed = self.last_result_time - self.alert_start_time
+        return min(elapsed / self.alert_threshold, 1.0)
@@ -0,0 +1,84 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import repository.drowsy_video_repo as drowsy_video_repo
+import repository.frame_repo as frame_repo
+from repository.frame_writer import frame_writer
+from core.telemetry import telemetry
+from utils.VideoManager import VideoManager
+
+
+class ClipPersister:
+    """
+    Lưu clip cảnh báo (ảnh + DB + mp4) ngoài thread scheduler
+    - Mỗi clip là một job trên thread điều phối riêng (các clip được lưu tuần tự)
+    - JPEG được encode song song trên pool encoder (cv2 nhả GIL khi encode), mp4 ghi song song từ frame trong bộ nhớ
+    - Toàn bộ Frame của clip được insert trong một transaction (FrameWriter)
+    Future của submit() chỉ hoàn thành khi ảnh, mp4 và các dòng Frame đã ghi xong;
+    lỗi khi lưu (kể cả cv2.imwrite trả về False) được raise qua Future
+    mode='video': chỉ ghi mp4, không ghi JPEG; imageURL của Frame trỏ vào video ("<mp4>#frame=<i>"),
+    màn hình xem lại phát thẳng file mp4 (VideoManager.get_drowsy_video). Dữ liệu huấn luyện vẫn lấy từ JPEG
+    nên mặc định là 'jpeg'.
+    """
+
+    MODES = ('jpeg', 'video')
+
+    def __init__(self, clock, class_names, max_workers=4, video_fps=30.0, mode='jpeg'):
+        if mode not in self.MODES:
+            raise ValueError(f"clip_mode không hợp lệ: {mode} (hỗ trợ: {', '.join(self.MODES)})")
+        self.clock = clock
+        self.class_names = class_names
+        self.video_fps = video_fps
+        self.mode = mode
+        self._jobs = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ClipPersister")
+        self._encoders = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ClipEncoder")
+
+    def submit(self, snapshot, folder, session_id, start_time, end_time):
+        """Đưa snapshot vào hàng đợi lưu. Returns: Future -> drowsyVideoID"""
+        return self._jobs.submit(self._persist, snapshot, folder, session_id, start_time, end_time)
+
+    def _persist(self, snapshot, folder, session_id, start_time, end_time):
+        start = time.perf_counter()
+        os.makedirs(folder, exist_ok=True)
+        drowsy_video_id = drowsy_video_repo.create_drowsy_video(session_id, start_time, end_time)
+        video_path = VideoManager.get_video_path(folder, drowsy_video_id)
+        write_images = self.mode == 'jpeg'
+
+        rows = []
+        for i in range(len(snapshot)):
+            confidence = float(snapshot.confidence[i])
+            class_name = self.class_names[int(snapshot.class_id[i])]
+            if write_images:
+                url_img = f"{folder}/frame_idx={snapshot.seq[i]}_{i}_confidence={confidence}_class={class_name}.jpg"
+            else:
+                url_img = VideoManager.frame_url(video_path, i)
+            created_at = self.clock.to_datetime(int(snapshot.ts_ns[i])).isoformat()
+            rows.append((confidence, class_name.lower() == 'drowsy', url_img, created_at))
+
+        # FPS theo khoảng thời gian thực của snapshot (adaptive_rate lấy mẫu thưa), tối đa là FPS camera
+        span_s = (int(snapshot.ts_ns[-1]) - int(snapshot.ts_ns[0])) / 1e9
+        fps = VideoManager.clip_fps(len(snapshot), span_s, self.video_fps)
+        video_job = self._encoders.submit(VideoManager.write_video, snapshot.frames, video_path, fps)
+        if write_images:
+            image_jobs = [self._encoders.submit(cv2.imwrite, row[2], frame)
+                          for row, frame in zip(rows, snapshot.frames)]
+            failed = [row[2] for row, job in zip(rows, image_jobs) if not job.result()]
+            if failed:
+                # cv2.imwrite không raise khi lỗi (thư mục không ghi được, đĩa đầy...) mà trả về False
+                raise IOError(f"Không ghi được {len(failed)}/{len(rows)} ảnh của clip {drowsy_video_id}: {failed[0]}")
+
+        # Ghi DB qua FrameWriter (một transaction cho cả clip), song song với việc ghi mp4
+        frame_jobs = frame_repo.submit_frames(drowsy_video_id, rows)
+        video_job.result()
+        frame_writer.flush()
+        for job in frame_jobs:
+            job.result()
+        telemetry.record_since('persist.clip_ms', start)
+        print(f"💾 Đã lưu clip {drowsy_video_id}: {len(rows)} frame -> {video_path}")
+        return drowsy_video_id
+
+    def close(self, wait=True):
+        """Dừng nhận job mới; mặc định chờ các clip đang lưu ghi xong"""
+        self._jobs.shutdown(wait=wait)
+        self._encoders.shutdown(wait=wait)
@@ -0,0 +1,92 @@
+import os
+import cv2
+
+
+class FaceRoiTracker:
+    """
+    Cắt vùng khuôn mặt tài xế trước khi đưa vào model phân loại
+    Dùng Haar cascade có sẵn trong cv2, chỉ chạy detect lại sau mỗi detect_interval frame;
+    giữa các lần detect, box cũ được dùng lại (khuôn mặt tài xế gần như cố định trong khung hình).
+    """
+
+    def __init__(self, detect_interval=10, margin=0.25, detect_width=320, smoothing=0.5, max_misses=3):
+        """
+        Args:
+            detect_interval: Số frame giữa hai lần chạy detect
+            margin: Phần mở rộng quanh khuôn mặt (tỷ lệ theo cạnh box) để giữ cả vùng mắt/miệng/đầu
+            detect_width: Chiều rộng ảnh thu nhỏ dùng để detect
+            smoothing: Hệ số làm mượt box giữa các lần detect (0 = giữ box cũ, 1 = lấy box mới)
+            max_misses: Số lần detect trượt liên tiếp trước khi bỏ box và dùng lại cả frame
+        """
+        cascade_path = os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise RuntimeError(f"Không load được Haar cascade: {cascade_path}")
+
+        self.detect_interval = detect_interval
+        self.margin = margin
+        self.detect_width = detect_width
+        self.smoothing = smoothing
+        self.max_misses = max_misses
+
+        self.box = None  # (x, y, side) vùng vuông trên frame gốc
+        self.frames_since_detect = detect_interval  # detect ngay frame đầu tiên
+        self.misses = 0
+
+    def crop(self, frame):
+        """
+        Trả về vùng khuôn mặt (view trên frame, không copy)
+        Khi chưa có box thì trả về nguyên frame
+        """
+        if self.box is None or self.frames_since_detect >= self.detect_interval:
+            self._detect(frame)
+        else:
+            self.frames_since_detect += 1
+
+        if self.box is None:
+            return frame
+        x, y, side = self.box
+        return frame[y:y + side, x:x + side]
+
+    def reset(self):
+        """Bỏ box hiện tại, detect lại ở frame kế tiếp"""
+        self.box = None
+        self.frames_since_detect = self.detect_interval
+        self.misses = 0
+
+    def _detect(self, frame):
+        self.frames_since_detect = 0
+        h, w = frame.shape[:2]
+
+        # Detect trên ảnh xám thu nhỏ
+        scale = min(1.0, self.detect_width / w)
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else frame
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        min_face = max(24, int(small.shape[0] * 0.15))
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_face, min_face))
+
+        if len(faces) == 0:
+            self.misses += 1
+            if self.misses > self.max_misses:
+                self.box = None
+            return
+        self.misses = 0
+
+        # Lấy khuôn mặt lớn nhất (tài xế), quy đổi về toạ độ frame gốc
+        fx, fy, fw, fh = max(faces, key=lambda f: f[2] * f[3])
+        cx = (fx + fw / 2) / scale
+        cy = (fy + fh / 2) / scale
+        side = max(fw, fh) / scale * (1 + 2 * self.margin)
+
+        if self.box is not None:
+            px, py, pside = self.box
+            a = self.smoothing
+            cx = (1 - a) * (px + pside / 2) + a * cx
+            cy = (1 - a) * (py + pside / 2) + a * cy
+            side = (1 - a) * pside + a * side
+
+        # Giữ vùng vuông nằm trọn trong frame
+        side = int(min(side, h, w))
+        x = int(min(max(cx - side / 2, 0), w - side))
+        y = int(min(max(cy - side / 2, 0), h - side))
+        self.box = (x, y, side)
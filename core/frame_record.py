@@ -0,0 +1,48 @@
+import itertools
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+
+class FrameRecord(NamedTuple):
+    """
+    Định danh gọn của một frame trong pipeline: số thứ tự tăng dần + thời điểm chụp (monotonic ns)
+    ts_ns: thời điểm chụp theo nguồn (replay file: vị trí trong bản ghi) - dùng cho cửa sổ cảnh báo, thời gian clip
+    arrival_ns: time.monotonic_ns() lúc frame vào pipeline - dùng đo thời gian chờ hàng đợi / độ trễ xử lý
+    """
+    seq: int
+    ts_ns: int
+    arrival_ns: int
+
+    @property
+    def timestamp(self):
+        """Thời điểm chụp theo giây (cùng gốc với time.monotonic())"""
+        return self.ts_ns / 1e9
+
+
+class FrameClock:
+    """
+    Cấp FrameRecord cho từng frame và quy đổi sang giờ thực khi cần lưu trữ
+    Trong pipeline chỉ dùng số nguyên (seq, monotonic ns); chuỗi ngày giờ chỉ được tạo lúc ghi DB / tên file.
+    """
+
+    TIME_FORMAT = "%Y%m%d_%H%M%S"
+
+    def __init__(self):
+        self._seq = itertools.count()
+        # Mốc quy đổi monotonic -> wall clock, lấy một lần khi khởi tạo
+        self._wall_ref_ns = time.time_ns()
+        self._mono_ref_ns = time.monotonic_ns()
+
+    def next(self, ts_ns=None):
+        """Tạo FrameRecord mới; ts_ns mặc định là thời điểm hiện tại"""
+        now_ns = time.monotonic_ns()
+        return FrameRecord(next(self._seq), now_ns if ts_ns is None else ts_ns, now_ns)
+
+    def to_datetime(self, ts_ns):
+        """Quy đổi timestamp monotonic (ns) sang datetime giờ địa phương"""
+        return datetime.fromtimestamp((self._wall_ref_ns + ts_ns - self._mono_ref_ns) / 1e9)
+
+    def format(self, ts_ns, fmt=TIME_FORMAT):
+        """Chuỗi giờ thực dùng cho DB / tên file (mặc định 'YYYYMMDD_HHMMSS')"""
+        return self.to_datetime(ts_ns).strftime(fmt)
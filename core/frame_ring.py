@@ -0,0 +1,90 @@
+import threading
+from typing import NamedTuple
+import numpy as np
+
+
+class FrameSnapshot(NamedTuple):
+    """Bản chụp các frame đã phân loại trong ring buffer, theo thứ tự cũ -> mới"""
+    seq: np.ndarray  # FrameRecord.seq
+    ts_ns: np.ndarray  # FrameRecord.ts_ns
+    confidence: np.ndarray
+    class_id: np.ndarray
+    frames: np.ndarray  # (n, H, W, 3) - bản copy, không bị ghi đè
+
+    def __len__(self):
+        return len(self.seq)
+
+
+class FrameRingBuffer:
+    """
+    Ring buffer cấp phát sẵn (N, H, W, 3) cho các frame đưa vào model + metadata (seq, ts, confidence, class)
+    - Producer ghi frame vào slot kế tiếp (copy vào vùng nhớ có sẵn, không cấp phát mới)
+    - Thread suy luận đọc frame trực tiếp từ slot (view) và ghi kết quả vào metadata
+    - Thread lưu trữ lấy snapshot các frame đã phân loại gần nhất
+    Mỗi slot dùng seq như seqlock: seq = -1 khi đang ghi, nên người đọc phát hiện được slot bị ghi đè.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.frames = None  # cấp phát khi biết kích thước frame đầu tiên
+        self.seq = np.full(self.capacity, -1, dtype=np.int64)
+        self.ts_ns = np.zeros(self.capacity, dtype=np.int64)
+        self.confidence = np.zeros(self.capacity, dtype=np.float32)
+        self.class_id = np.full(self.capacity, -1, dtype=np.int16)  # -1 = chưa phân loại
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def write(self, record, frame):
+        """Copy frame vào slot kế tiếp. Returns: slot"""
+        with self._lock:
+            if self.frames is None or self.frames.shape[1:] != frame.shape:
+                self._allocate(frame.shape)
+            slot = self._writes % self.capacity
+            self._writes += 1
+            self.seq[slot] = -1
+            self.class_id[slot] = -1
+
+        np.copyto(self.frames[slot], frame)
+        self.ts_ns[slot] = record.ts_ns
+        self.seq[slot] = record.seq
+        return slot
+
+    def _allocate(self, shape):
+        self.frames = np.empty((self.capacity,) + tuple(shape), dtype=np.uint8)
+        self.seq.fill(-1)
+        self.class_id.fill(-1)
+
+    def is_valid(self, slot, seq):
+        """Slot vẫn còn giữ frame có seq này (chưa bị ghi đè)"""
+        return self.seq[slot] == seq
+
+    def set_result(self, slot, seq, class_id, confidence):
+        """Ghi kết quả phân loại cho slot. Returns: False nếu slot đã bị ghi đè"""
+        if self.seq[slot] != seq:
+            return False
+        self.confidence[slot] = confidence
+        self.class_id[slot] = class_id
+        return True
+
+    def snapshot(self, limit):
+        """
+        Lấy tối đa limit frame đã phân loại gần nhất (cũ -> mới)
+        Frame được copy rồi kiểm tra lại seq, slot nào bị ghi đè trong lúc copy sẽ bị loại.
+        """
+        with self._lock:
+            if self.frames is None:
+                return None
+            writes = self._writes
+            slots = np.arange(max(0, writes - self.capacity), writes) % self.capacity
+            slots = slots[(self.class_id[slots] >= 0) & (self.seq[slots] >= 0)][-limit:]
+            seq = self.seq[slots].copy()
+
+        frames = self.frames[slots]  # fancy indexing -> copy
+        keep = self.seq[slots] == seq
+        return FrameSnapshot(
+            seq=seq[keep],
+            ts_ns=self.ts_ns[slots][keep],
+            confidence=self.confidence[slots][keep],
+            class_id=self.class_id[slots][keep],
+            frames=frames[keep] if not keep.all() else frames,
+        )
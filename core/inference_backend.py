@@ -0,0 +1,189 @@
+import json
+import os
+import numpy as np
+import torch
+from ultralytics import YOLO
+from core.preprocessing import ClassifyPreprocessor
+
+
+class InferenceBackend:
+    """
+    Giao diện chung cho các backend phân loại buồn ngủ
+    Mỗi backend nhận list frame BGR và trả về (class_ids, confidences) theo đúng thứ tự frame
+    """
+
+    def __init__(self, model_path, batch_size=4, fast_preprocess=False):
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.fast_preprocess = fast_preprocess
+        self.names = {}  # {class_id: class_name}
+        self.preprocessor = None  # ClassifyPreprocessor khi dùng đường tiền xử lý riêng
+
+    def predict(self, frames):
+        """
+        Phân loại một batch frame
+        Returns: (class_ids: np.ndarray[int], confidences: np.ndarray[float32])
+        """
+        if self.preprocessor is None:
+            return self._predict_ultralytics(frames)
+        return self.forward(self.preprocessor(frames))
+
+    def forward(self, batch):
+        """Chạy model trực tiếp trên batch NCHW đã tiền xử lý"""
+        raise NotImplementedError
+
+    def _predict_ultralytics(self, frames):
+        raise NotImplementedError
+
+    def close(self):
+        """Giải phóng tài nguyên của backend"""
+        pass
+
+    @staticmethod
+    def _collect(results):
+        """Rút top1 / top1conf từ kết quả ultralytics"""
+        class_ids = np.fromiter((r.probs.top1 for r in results), dtype=np.int64, count=len(results))
+        confidences = np.fromiter((r.probs.top1conf.item() for r in results), dtype=np.float32, count=len(results))
+        return class_ids, confidences
+
+    @staticmethod
+    def _top1(probs):
+        """Rút top1 / top1conf từ ma trận xác suất (N, num_classes)"""
+        class_ids = probs.argmax(axis=1)
+        confidences = probs[np.arange(len(probs)), class_ids].astype(np.float32, copy=False)
+        return class_ids, confidences
+
+
+class TorchBackend(InferenceBackend):
+    """Backend mặc định: chạy trực tiếp file .pt qua ultralytics (PyTorch)"""
+
+    load_args = {}
+    predict_args = {}
+
+    def __init__(self, model_path, batch_size=4, fast_preprocess=False):
+        super().__init__(model_path, batch_size, fast_preprocess)
+        self.model = YOLO(self._weights_path(), **self.load_args)
+        self.names = self.model.names
+        self.net = None
+        self.device = None
+        if fast_preprocess:
+            self._setup_direct()
+
+    def _weights_path(self):
+        return self.model_path
+
+    def _setup_direct(self):
+        """
+        Dựng đường suy luận trực tiếp, bỏ qua predictor của ultralytics
+        Chạy predictor một lần để ultralytics tự chọn device, fuse model, mở session ONNX/OpenVINO,
+        sau đó giữ lại AutoBackend và imgsz để gọi forward thẳng trên batch tự tiền xử lý.
+        """
+        self.model.predict(np.zeros((32, 32, 3), dtype=np.uint8), verbose=False, **self.predict_args)
+        predictor = self.model.predictor
+        self.net = predictor.model
+        self.device = predictor.device
+        imgsz = predictor.imgsz
+        imgsz = imgsz[0] if isinstance(imgsz, (list, tuple)) else imgsz
+        self.preprocessor = ClassifyPreprocessor(imgsz, self.batch_size)
+
+    def forward(self, batch):
+        with torch.inference_mode():
+            preds = self.net(torch.from_numpy(batch).to(self.device))
+        if isinstance(preds, (list, tuple)):
+            preds = preds[0]
+        probs = preds.cpu().numpy() if isinstance(preds, torch.Tensor) else np.asarray(preds)
+        return self._top1(probs)
+
+    def _predict_ultralytics(self, frames):
+        results = self.model(frames, verbose=False, **self.predict_args)
+        return self._collect(results)
+
+
+class ExportedBackend(TorchBackend):
+    """
+    Backend chạy model đã export (ONNX Runtime / OpenVINO) trên CPU
+    File export được cache cạnh file .pt và export lại khi file .pt thay đổi.
+    Model được export với batch động để forward cả batch một lần.
+    """
+
+    export_format = None
+    load_args = {'task': 'classify'}
+    predict_args = {'device': 'cpu'}
+
+    def _weights_path(self):
+        return export_model(self.model_path, self.export_format)
+
+
+class OnnxBackend(ExportedBackend):
+    """ONNX Runtime - CPUExecutionProvider"""
+    export_format = 'onnx'
+
+
+class OpenVinoBackend(ExportedBackend):
+    """OpenVINO runtime (CPU)"""
+    export_format = 'openvino'
+
+
+BACKENDS = {
+    'torch': TorchBackend,
+    'onnx': OnnxBackend,
+    'openvino': OpenVinoBackend,
+}
+
+
+def create_backend(model_path, backend='torch', batch_size=4, fast_preprocess=False):
+    """
+    Khởi tạo backend theo tên ('torch' | 'onnx' | 'openvino')
+    fast_preprocess=False (mặc định): dùng predictor của ultralytics (classify_transforms, resize bilinear của PIL),
+        xác suất khớp tuyệt đối với YOLO.predict
+    fast_preprocess=True: ClassifyPreprocessor (resize bằng cv2) ghi vào batch cấp phát sẵn rồi forward trực tiếp,
+        nhanh hơn nhưng xác suất lệch nhẹ so với ultralytics (có thể đổi kết quả ở frame sát ngưỡng) - bật có chủ đích
+    """
+    try:
+        backend_cls = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Backend không hợp lệ: {backend} (hỗ trợ: {', '.join(BACKENDS)})")
+    return backend_cls(model_path, batch_size, fast_preprocess)
+
+
+def _exported_path(model_path, export_format):
+    """Đường dẫn file export mà ultralytics sinh ra cạnh file .pt"""
+    stem, _ = os.path.splitext(model_path)
+    if export_format == 'onnx':
+        return f"{stem}.onnx"
+    return f"{stem}_{export_format}_model"
+
+
+# Tham số export: batch động để forward cả batch trong một lần gọi
+EXPORT_ARGS = {'dynamic': True}
+
+
+def _source_stamp(model_path):
+    """Dấu vết file .pt (kích thước + mtime) + tham số export để phát hiện cache cũ"""
+    st = os.stat(model_path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, **EXPORT_ARGS}
+
+
+def export_model(model_path, export_format):
+    """
+    Export model sang export_format nếu chưa có cache hoặc cache đã cũ
+    Returns: đường dẫn model đã export
+    """
+    exported_path = _exported_path(model_path, export_format)
+    stamp_path = f"{exported_path}.stamp.json"
+    stamp = _source_stamp(model_path)
+
+    if os.path.exists(exported_path) and os.path.exists(stamp_path):
+        try:
+            with open(stamp_path, 'r') as file:
+                if json.load(file) == stamp:
+                    return exported_path
+        except (OSError, ValueError):
+            pass
+
+    print(f"🔄 Export model {model_path} sang {export_format}...")
+    exported_path = YOLO(model_path).export(format=export_format, device='cpu', verbose=False, **EXPORT_ARGS)
+    with open(stamp_path, 'w') as file:
+        json.dump(stamp, file)
+    print(f"✅ Đã export model: {exported_path}")
+    return exported_path
@@ -0,0 +1,209 @@
+import multiprocessing as mp
+import traceback
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from core.inference_backend import InferenceBackend
+from core.preprocessing import ClassifyPreprocessor
+
+
+def _attach_shared_memory(name):
+    """
+    Mở shared memory do tiến trình cha tạo mà không đăng ký với resource_tracker của tiến trình con
+    (nếu không, tracker cảnh báo rò rỉ và unlink vùng nhớ khi con thoát, dù cha vẫn đang dùng)
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python >= 3.13
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _worker_main(conn, model_path, backend, batch_size):
+    """
+    Tiến trình con: load backend, chờ batch trong shared memory và trả (idx, class_id, confidence)
+    Giao thức qua Pipe:
+        con -> cha: ('ready', names, imgsz) | ('result', token, [(idx, class_id, conf), ...]) | ('error', token, msg)
+        cha -> con: ('attach', shm_name, shape) | ('run', token, n) | ('stop',)
+    """
+    # Import trong tiến trình con để tiến trình cha không phải load torch/ultralytics lần nữa
+    from core.inference_backend import create_backend
+
+    shm = None
+    try:
+        model = create_backend(model_path, backend=backend, batch_size=batch_size, fast_preprocess=True)
+        conn.send(('ready', dict(model.names), model.preprocessor.imgsz))
+
+        batch = None
+        while True:
+            message = conn.recv()
+            command = message[0]
+            if command == 'stop':
+                break
+            if command == 'attach':
+                _, shm_name, shape = message
+                if shm is not None:
+                    shm.close()
+                shm = _attach_shared_memory(shm_name)
+                batch = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+            elif command == 'run':
+                _, token, n = message
+                try:
+                    class_ids, confidences = model.forward(batch[:n])
+                    conn.send(('result', token, [(i, int(c), float(p)) for i, (c, p) in
+                                                 enumerate(zip(class_ids, confidences))]))
+                except Exception as e:
+                    conn.send(('error', token, f"{type(e).__name__}: {e}"))
+        model.close()
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        batch = None
+        if shm is not None:
+            shm.close()
+        conn.close()
+
+
+class ProcessBackend(InferenceBackend):
+    """
+    Chạy model trong một tiến trình riêng (spawn) để suy luận không tranh GIL với UI / CameraThread
+    - Tiền xử lý ở tiến trình chính, ghi thẳng vào batch NCHW trong shared memory (không pickle ảnh)
+    - Tiến trình con chỉ forward và trả về list (idx, class_id, confidence)
+    - Tiến trình con chết / treo thì được khởi động lại và chạy lại batch đang dở;
+      khởi động lại thất bại thì batch đó lỗi, backend ở trạng thái chết và lần predict sau thử khởi động lại
+    Luôn dùng đường tiền xử lý riêng (fast_preprocess) của backend bên trong, nên xác suất lệch nhẹ
+    so với YOLO.predict (xem create_backend).
+    """
+
+    def __init__(self, model_path, backend='torch', batch_size=4, start_timeout=120, predict_timeout=10,
+                 max_restarts=3):
+        super().__init__(model_path, batch_size, fast_preprocess=True)
+        self.inner_backend = backend
+        self.start_timeout = start_timeout
+        self.predict_timeout = predict_timeout
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self._ctx = mp.get_context('spawn')
+        self._process = None
+        self._conn = None
+        self._shm = None
+        self._token = 0
+        self._start_worker()
+
+    def _start_worker(self):
+        """Khởi động tiến trình con; lỗi thì dọn dẹp để backend ở trạng thái chết (_conn None) rồi raise"""
+        try:
+            self._spawn_worker()
+        except BaseException:
+            self._kill_worker()
+            raise
+
+    def _spawn_worker(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.model_path, self.inner_backend, self.batch_size),
+            name="InferenceWorker",
+            daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+        if not self._conn.poll(self.start_timeout):
+            raise RuntimeError("Tiến trình suy luận không khởi động kịp")
+        try:
+            _, names, imgsz = self._conn.recv()
+        except EOFError:
+            raise RuntimeError("Tiến trình suy luận lỗi khi load model")
+        self.names = names
+
+        # Shared memory giữ nguyên qua các lần khởi động lại, chỉ cấp phát lần đầu
+        shape = (self.batch_size, 3, imgsz, imgsz)
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+            batch = np.ndarray(shape, dtype=np.float32, buffer=self._shm.buf)
+            self.preprocessor = ClassifyPreprocessor(imgsz, self.batch_size, out=batch)
+        self._conn.send(('attach', self._shm.name, shape))
+        print(f"✅ Tiến trình suy luận đã sẵn sàng (pid={self._process.pid})")
+
+    def _kill_worker(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._process is not None:
+            if self._process.is_alive():
+                self._process.kill()
+            self._process.join(timeout=2)
+            self._process = None
+
+    def _restart_worker(self, reason):
+        self.restarts += 1
+        print(f"⚠️ Tiến trình suy luận gặp sự cố ({reason}), khởi động lại lần {self.restarts}")
+        self._kill_worker()
+        try:
+            self._start_worker()
+        except Exception as e:
+            raise RuntimeError(f"Không khởi động lại được tiến trình suy luận, sẽ thử lại ở batch sau: {e}") from e
+
+    def predict(self, frames):
+        # Batch lớn hơn buffer shared memory thì chia nhỏ
+        if len(frames) > self.batch_size:
+            parts = [self.predict(frames[i:i + self.batch_size]) for i in range(0, len(frames), self.batch_size)]
+            return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+        return self.forward(self.preprocessor(frames))
+
+    def forward(self, batch):
+        """batch phải là view trên shared memory (kết quả của self.preprocessor)"""
+        n = len(batch)
+        attempts = 0
+        while True:
+            try:
+                if self._conn is None:
+                    # Lần khởi động lại trước thất bại: thử lại (lỗi thì batch này lỗi, batch sau thử tiếp)
+                    self._restart_worker("tiến trình chưa chạy")
+                return self._run(n)
+            except (EOFError, BrokenPipeError, ConnectionResetError, TimeoutError) as e:
+                attempts += 1
+                if attempts > self.max_restarts:
+                    raise RuntimeError(f"Tiến trình suy luận lỗi liên tục: {e}")
+                self._restart_worker(type(e).__name__)
+
+    def _run(self, n):
+        self._token += 1
+        token = self._token
+        self._conn.send(('run', token, n))
+        while True:
+            if not self._conn.poll(self.predict_timeout):
+                raise TimeoutError("quá thời gian chờ kết quả")
+            message = self._conn.recv()
+            if message[1] != token:
+                continue  # kết quả trễ của batch trước
+            if message[0] == 'error':
+                raise RuntimeError(f"Lỗi suy luận trong tiến trình con: {message[2]}")
+            break
+
+        class_ids = np.zeros(n, dtype=np.int64)
+        confidences = np.zeros(n, dtype=np.float32)
+        for idx, class_id, confidence in message[2]:
+            class_ids[idx] = class_id
+            confidences[idx] = confidence
+        return class_ids, confidences
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.send(('stop',))
+            except (OSError, BrokenPipeError):
+                pass
+        if self._process is not None:
+            self._process.join(timeout=2)
+        self._kill_worker()
+        if self._shm is not None:
+            self.preprocessor = None
+            try:
+                self._shm.close()
+                self._shm.unlink()
+            except (BufferError, FileNotFoundError):
+                traceback.print_exc()
+            self._shm = None
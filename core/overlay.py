@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+
+
+class OverlayRenderer:
+    """
+    Vẽ bảng thông số (nền đen mờ + chữ + thanh tiến trình) ở góc trên trái frame
+    Bảng được render sẵn thành một tile nhỏ (màu đã nhân alpha + alpha nghịch) và chỉ render lại
+    khi nội dung thay đổi; mỗi frame chỉ blend tile đó lên vùng ROI, ngay trên frame.
+    Nền phủ từ (0, 0) tới góc (x2, y2) tính cả biên, giống cv2.rectangle(frame, (0, 0), (x2, y2), ..., -1).
+    """
+
+    def __init__(self, x2=400, y2=150, background_alpha=0.6):
+        # cv2.rectangle tô cả hàng / cột chứa góc dưới phải: tile rộng x2 - x1 + 1, cao y2 - y1 + 1
+        self.width = x2 + 1
+        self.height = y2 + 1
+        self.background_alpha = background_alpha
+        self._key = None
+        # Alpha lưu dạng số nguyên thang 256 để blend bằng phép nhân/dịch bit trên uint16
+        self._premultiplied = np.zeros((height, width, 3), dtype=np.uint16)  # màu * alpha
+        self._inv_alpha = np.zeros((height, width, 1), dtype=np.uint16)  # 256 - alpha
+        self._work = np.empty((height, width, 3), dtype=np.uint16)
+
+    def draw(self, frame, texts, progress_bar=None):
+        """
+        Blend bảng thông số lên frame (in-place)
+        Args:
+            texts: list (text, (x, y), font_scale, color_bgr)
+            progress_bar: None hoặc (x, y, width, height, fill_width, fill_color, border_color)
+        """
+        key = (tuple(texts), progress_bar)
+        if key != self._key:
+            self._render(texts, progress_bar)
+            self._key = key
+
+        h = min(self.height, frame.shape[0])
+        w = min(self.width, frame.shape[1])
+        roi = frame[:h, :w]
+        work = self._work[:h, :w]
+        # roi = (roi * (256 - a) + color * a) >> 8
+        np.multiply(roi, self._inv_alpha[:h, :w], out=work)
+        np.add(work, self._premultiplied[:h, :w], out=work)
+        np.right_shift(work, 8, out=work)
+        roi[...] = work
+        return frame
+
+    def _render(self, texts, progress_bar):
+        color = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        opaque = np.zeros((self.height, self.width), dtype=np.uint8)  # 255 = phần tử vẽ đè hoàn toàn
+
+        for text, org, scale, text_color in texts:
+            cv2.putText(color, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, text_color, 2)
+            cv2.putText(opaque, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, 255, 2)
+
+        if progress_bar is not None:
+            x, y, bar_w, bar_h, fill_w, fill_color, border_color = progress_bar
+            cv2.rectangle(color, (x, y), (x + fill_w, y + bar_h), fill_color, -1)
+            cv2.rectangle(opaque, (x, y), (x + fill_w, y + bar_h), 255, -1)
+            cv2.rectangle(color, (x, y), (x + bar_w, y + bar_h), border_color, 2)
+            cv2.rectangle(opaque, (x, y), (x + bar_w, y + bar_h), 255, 2)
+
+        alpha = np.where(opaque[..., None] > 0, 256, round(self.background_alpha * 256)).astype(np.uint16)
+        np.multiply(color, alpha, out=self._premultiplied)
+        np.subtract(256, alpha, out=self._inv_alpha)
@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+
+class ClassifyPreprocessor:
+    """
+    Tiền xử lý frame BGR cho model phân loại, ghi thẳng vào một batch tensor NCHW cấp phát sẵn
+    Cùng các bước với classify_transforms của ultralytics: center-crop vuông -> resize imgsz -> RGB -> /255,
+    nhưng resize bằng cv2 thay cho PIL nên giá trị pixel (và xác suất) không khớp tuyệt đối với YOLO.predict
+    Buffer được tái sử dụng giữa các batch: kết quả trả về chỉ hợp lệ tới lần gọi kế tiếp.
+    """
+
+    def __init__(self, imgsz, max_batch=4, dtype=np.float32, out=None):
+        """
+        Args:
+            imgsz: Kích thước ảnh vuông đầu vào của model
+            max_batch: Số frame tối đa mỗi batch (buffer tự mở rộng nếu vượt)
+            dtype: np.float32 (chuẩn hoá /255) hoặc np.uint8 (giữ nguyên giá trị pixel)
+            out: Buffer (N, 3, imgsz, imgsz) có sẵn để ghi vào (vd: shared memory)
+        """
+        self.imgsz = int(imgsz)
+        self.dtype = np.dtype(dtype)
+        self.normalize = self.dtype.kind == 'f'
+        if out is not None:
+            self.buffer = out
+        else:
+            self.buffer = np.empty((max_batch, 3, self.imgsz, self.imgsz), dtype=self.dtype)
+        # Ảnh trung gian sau resize (HWC, uint8), dùng chung cho mọi frame
+        self._resized = np.empty((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+
+    def __call__(self, frames):
+        """
+        Args:
+            frames: list ảnh BGR (H, W, 3) uint8, kích thước có thể khác nhau (vd: ảnh crop khuôn mặt)
+        Returns: view (len(frames), 3, imgsz, imgsz) trên buffer
+        """
+        n = len(frames)
+        if n > len(self.buffer):
+            self.buffer = np.empty((n,) + self.buffer.shape[1:], dtype=self.dtype)
+
+        for i, frame in enumerate(frames):
+            self._resize_center_crop(frame)
+            # BGR -> RGB, HWC -> CHW ngay trong lúc ghi vào buffer
+            chw = self._resized[:, :, ::-1].transpose(2, 0, 1)
+            if self.normalize:
+                np.multiply(chw, 1 / 255, out=self.buffer[i], casting='unsafe')
+            else:
+                self.buffer[i] = chw
+        return self.buffer[:n]
+
+    def _resize_center_crop(self, frame):
+        """Cắt vùng vuông ở giữa (view, không copy) rồi resize vào self._resized"""
+        h, w = frame.shape[:2]
+        side = min(h, w)
+        y0 = (h - side) // 2
+        x0 = (w - side) // 2
+        crop = frame[y0:y0 + side, x0:x0 + side]
+        interpolation = cv2.INTER_AREA if side > self.imgsz else cv2.INTER_LINEAR
+        cv2.resize(crop, (self.imgsz, self.imgsz), dst=self._resized, interpolation=interpolation)
@@ -0,0 +1,92 @@
+import heapq
+import itertools
+import threading
+import time
+import traceback
+
+
+class ScheduledEvent:
+    """Sự kiện đã lên lịch, có thể huỷ trước khi tới hạn"""
+
+    __slots__ = ('when', 'seq', 'callback', 'args', 'cancelled')
+
+    def __init__(self, when, seq, callback, args):
+        self.when = when
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def __lt__(self, other):
+        return (self.when, self.seq) < (other.when, other.seq)
+
+
+class EventScheduler:
+    """
+    Bộ hẹn giờ dùng heap, chạy mọi sự kiện trên một thread duy nhất
+    Thay cho việc tạo thread mới chỉ để sleep rồi đổi cờ, hoặc thread poll định kỳ.
+    Callback chạy tuần tự theo thời điểm tới hạn nên không được block quá lâu.
+    """
+
+    def __init__(self, name="EventScheduler", clock=time.monotonic):
+        self.clock = clock
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def call_later(self, delay, callback, *args):
+        """Chạy callback(*args) sau delay giây. Returns: ScheduledEvent"""
+        event = ScheduledEvent(self.clock() + max(delay, 0.0), next(self._seq), callback, args)
+        with self._cond:
+            heapq.heappush(self._heap, event)
+            # Chỉ cần đánh thức thread khi sự kiện mới là sự kiện sớm nhất
+            if self._heap[0] is event:
+                self._cond.notify()
+        return event
+
+    def call_soon(self, callback, *args):
+        """Chạy callback(*args) ngay khi scheduler rảnh"""
+        return self.call_later(0.0, callback, *args)
+
+    def pending(self):
+        """Số sự kiện đang chờ (kể cả đã huỷ nhưng chưa bị loại khỏi heap)"""
+        with self._cond:
+            return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    timeout = self._heap[0].when - self.clock()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if not self._running:
+                    return
+                event = heapq.heappop(self._heap)
+
+            if event.cancelled:
+                continue
+            try:
+                event.callback(*event.args)
+            except Exception as e:
+                print(f"⚠️ Lỗi trong sự kiện {getattr(event.callback, '__name__', event.callback)}: {e}")
+                traceback.print_exc()
+
+    def stop(self, timeout=2):
+        """Dừng scheduler, bỏ các sự kiện chưa tới hạn"""
+        with self._cond:
+            self._running = False
+            self._heap.clear()
+            self._cond.notify()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
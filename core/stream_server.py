@@ -0,0 +1,256 @@
+import threading
+import time
+from collections import deque
+import cv2
+from core.alert_state import AlertStateMachine
+from core.frame_record import FrameClock
+from core.inference_backend import create_backend
+from core.window_stats import SlidingWindowStats
+
+
+class ModelCache:
+    """Mỗi file model (+ backend) chỉ được load một lần, dùng chung cho mọi luồng camera"""
+
+    def __init__(self, backend='torch', batch_size=8, fast_preprocess=False):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.fast_preprocess = fast_preprocess
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_path):
+        with self._lock:
+            model = self._models.get(model_path)
+            if model is None:
+                print(f"🔄 Load model {model_path} ({self.backend})")
+                model = create_backend(model_path, backend=self.backend, batch_size=self.batch_size,
+                                       fast_preprocess=self.fast_preprocess)
+                self._models[model_path] = model
+            return model
+
+    def close(self):
+        with self._lock:
+            for model in self._models.values():
+                model.close()
+            self._models.clear()
+
+
+class FairBatchQueue:
+    """
+    Hàng đợi gom batch công bằng giữa các luồng dùng chung một model
+    Mỗi luồng có hàng đợi riêng giới hạn depth (đầy thì bỏ frame cũ nhất); batch được gom theo vòng
+    round-robin, mỗi vòng lấy tối đa một frame của mỗi luồng, luồng bắt đầu xoay vòng sau mỗi batch.
+    """
+
+    def __init__(self, batch_size=8, depth=2):
+        self.batch_size = batch_size
+        self.depth = depth
+        self._queues = {}  # stream -> deque[(record, frame)]
+        self._order = []
+        self._start = 0
+        self._cond = threading.Condition()
+
+    def register(self, stream):
+        with self._cond:
+            self._queues[stream] = deque(maxlen=self.depth)
+            self._order.append(stream)
+
+    def put(self, stream, record, frame):
+        """Returns: False nếu phải bỏ frame cũ nhất của luồng"""
+        with self._cond:
+            q = self._queues[stream]
+            dropped = len(q) == q.maxlen
+            q.append((record, frame))
+            self._cond.notify()
+        return not dropped
+
+    def get_batch(self, timeout=0.1):
+        """Returns: list (stream, record, frame), rỗng nếu hết timeout"""
+        with self._cond:
+            if not any(self._queues.values()):
+                self._cond.wait(timeout)
+            batch = []
+            n = len(self._order)
+            while len(batch) < self.batch_size:
+                taken = False
+                for i in range(n):
+                    stream = self._order[(self._start + i) % n]
+                    q = self._queues[stream]
+                    if q:
+                        batch.append((stream,) + q.popleft())
+                        taken = True
+                        if len(batch) == self.batch_size:
+                            break
+                if not taken:
+                    break
+            if n:
+                self._start = (self._start + 1) % n
+            return batch
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+
+class CameraStream:
+    """Một nguồn video (camera / RTSP / file) + trạng thái cảnh báo và thống kê riêng"""
+
+    def __init__(self, name, source, model_path, alert_threshold=3, min_history_seconds=1.0, realtime=True):
+        self.name = name
+        self.source = source
+        self.model_path = model_path
+        self.realtime = realtime  # File video: đọc theo FPS gốc thay vì nhanh nhất có thể
+        self.clock = FrameClock()
+        self.alerts = AlertStateMachine(alert_threshold, min_history_seconds=min_history_seconds)
+        self.current_class = "Unknown"
+        self.current_confidence = 0.0
+        self.finished = False
+
+        self.captured = 0
+        self.dropped = 0
+        self.inferred = 0
+        self.alert_count = 0
+        self.latency_ms = SlidingWindowStats(300)  # từ lúc chụp tới lúc có kết quả
+        self._last_report = (time.monotonic(), 0, 0)
+
+    def open(self):
+        source = int(self.source) if str(self.source).isdigit() else self.source
+        capture = cv2.VideoCapture(source)
+        if not capture.isOpened():
+            raise RuntimeError(f"Không mở được nguồn video {self.source} ({self.name})")
+        return capture
+
+    def report(self):
+        """Thống kê từ lần report trước: FPS chụp, FPS suy luận, độ trễ"""
+        now = time.monotonic()
+        last_time, last_captured, last_inferred = self._last_report
+        elapsed = max(now - last_time, 1e-6)
+        self._last_report = (now, self.captured, self.inferred)
+        return {
+            'stream': self.name,
+            'capture_fps': (self.captured - last_captured) / elapsed,
+            'inference_fps': (self.inferred - last_inferred) / elapsed,
+            'latency_ms': self.latency_ms.mean,
+            'latency_max_ms': max(self.latency_ms.values(), default=0.0),
+            'dropped': self.dropped,
+            'class': self.current_class,
+            'drowsy_ratio': self.alerts.drowsy_ratio,
+            'alerts': self.alert_count,
+            'finished': self.finished,
+        }
+
+
+class DetectionServer:
+    """
+    Chế độ server không giao diện: N luồng camera dùng chung model đã load
+    - Mỗi luồng có một thread đọc frame, đẩy vào FairBatchQueue của model tương ứng
+    - Mỗi model có một thread suy luận gom batch công bằng giữa các luồng
+    - Mỗi luồng giữ AlertStateMachine riêng; on_alert(stream, record, drowsy_ratio, avg_conf) khi cảnh báo
+    """
+
+    def __init__(self, batch_size=8, backend='torch', fast_preprocess=False, queue_depth=2, on_alert=None):
+        self.batch_size = batch_size
+        self.queue_depth = queue_depth
+        self.on_alert = on_alert
+        self.models = ModelCache(backend, batch_size, fast_preprocess)
+        self.streams = []
+        self._queues = {}  # model_path -> FairBatchQueue
+        self._threads = []
+        self.running = False
+
+    def add_stream(self, stream):
+        self.streams.append(stream)
+        if stream.model_path not in self._queues:
+            self._queues[stream.model_path] = FairBatchQueue(self.batch_size, self.queue_depth)
+        self._queues[stream.model_path].register(stream)
+
+    def start(self):
+        self.running = True
+        for model_path, batch_queue in self._queues.items():
+            model = self.models.get(model_path)
+            self._start_thread(self._inference_loop, f"Inference-{model_path}", model, batch_queue)
+        for stream in self.streams:
+            self._start_thread(self._capture_loop, f"Capture-{stream.name}", stream)
+
+    def _start_thread(self, target, name, *args):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _capture_loop(self, stream):
+        try:
+            capture = stream.open()
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            stream.finished = True
+            return
+
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        frame_interval = 1.0 / fps if stream.realtime and fps and fps > 0 else 0.0
+        # Chỉ file video mới cần giữ nhịp; camera tự trả frame theo FPS của nó
+        paced = frame_interval > 0 and capture.get(cv2.CAP_PROP_FRAME_COUNT) > 0
+        deadline = time.monotonic()
+        batch_queue = self._queues[stream.model_path]
+
+        while self.running:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            record = stream.clock.next()
+            stream.captured += 1
+            if not batch_queue.put(stream, record, frame):
+                stream.dropped += 1
+            if paced:
+                deadline += frame_interval
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    deadline = time.monotonic()  # chậm hơn nhịp gốc: không dồn frame để đuổi kịp
+
+        capture.release()
+        stream.finished = True
+        batch_queue.wake()
+        print(f"⏹️ Luồng {stream.name} đã dừng")
+
+    def _inference_loop(self, model, batch_queue):
+        names = model.names
+        while self.running:
+            batch = batch_queue.get_batch()
+            if not batch:
+                continue
+            try:
+                class_ids, confidences = model.predict([frame for _, _, frame in batch])
+            except Exception as e:
+                print(f"⚠️ Lỗi suy luận, bỏ qua batch: {e}")
+                continue
+
+            done_ns = time.monotonic_ns()
+            for (stream, record, frame), class_id, confidence in zip(batch, class_ids, confidences):
+                class_name = names[int(class_id)]
+                confidence = float(confidence)
+                stream.current_class = class_name
+                stream.current_confidence = confidence
+                stream.inferred += 1
+                stream.latency_ms.push((done_ns - record.arrival_ns) / 1e6)
+
+                event = stream.alerts.update(record.timestamp, class_name.lower() == 'drowsy', confidence)
+                if event == AlertStateMachine.ALERT:
+                    stream.alert_count += 1
+                    if self.on_alert:
+                        self.on_alert(stream, record, stream.alerts.drowsy_ratio, stream.alerts.avg_confidence)
+
+    def report(self):
+        return [stream.report() for stream in self.streams]
+
+    def all_finished(self):
+        return all(stream.finished for stream in self.streams)
+
+    def stop(self):
+        self.running = False
+        for batch_queue in self._queues.values():
+            batch_queue.wake()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads.clear()
+        self.models.close()
@@ -0,0 +1,202 @@
+import json
+import os
+import threading
+import time
+import core.config as config
+
+
+class Histogram:
+    """
+    Histogram kích thước cố định kiểu HDR (log-linear): mỗi khoảng lũy thừa 2 chia thành SUB_BUCKETS ô đều nhau
+    Sai số tương đối của percentile <= 1/SUB_BUCKETS, bộ nhớ cố định, record O(1) (không cấp phát).
+    Giá trị được lưu theo đơn vị 1/SCALE (mặc định 1 µs khi giá trị tính bằng ms).
+    Giá trị âm hoặc vượt quá phạm vi (kể cả NaN/inf) không được ghi vào histogram mà đếm riêng
+    trong negative / overflow, để số đo sai (vd mốc thời gian lệch gốc) lộ ra thay vì thành p50 = 0.
+    """
+
+    SUB_BITS = 4
+    SUB_BUCKETS = 1 << SUB_BITS
+    MAGNITUDES = 32  # đủ cho tới ~2^35 đơn vị (~9.5 giờ với đơn vị µs)
+    SCALE = 1000
+    MAX_UNITS = 1 << (MAGNITUDES + SUB_BITS - 1)  # giá trị (theo đơn vị) nhỏ nhất vượt phạm vi
+
+    def __init__(self):
+        self.counts = [0] * (self.MAGNITUDES * self.SUB_BUCKETS)
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.negative = 0
+        self.overflow = 0
+
+    def record(self, value):
+        # Ghi từ nhiều thread không khoá: hiếm khi mất một lần đếm khi tranh chấp, chấp nhận được cho telemetry
+        if value < 0:
+            self.negative += 1
+            return
+        units = value * self.SCALE
+        if not units < self.MAX_UNITS:
+            self.overflow += 1
+            return
+        units = int(units)
+        self.counts[self._index(units)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if value < self.min:
+            self.min = value
+
+    def _index(self, units):
+        if units < self.SUB_BUCKETS:
+            return units  # giá trị nhỏ: mỗi đơn vị một ô
+        # units = top << magnitude với top trong [SUB_BUCKETS, 2*SUB_BUCKETS)
+        magnitude = units.bit_length() - self.SUB_BITS - 1
+        top = units >> magnitude
+        return (magnitude + 1) * self.SUB_BUCKETS + top - self.SUB_BUCKETS
+
+    def _upper_value(self, index):
+        """Giá trị lớn nhất thuộc ô index (theo đơn vị gốc)"""
+        if index < self.SUB_BUCKETS:
+            return index / self.SCALE
+        magnitude = index // self.SUB_BUCKETS - 1
+        sub = index % self.SUB_BUCKETS + self.SUB_BUCKETS
+        return (((sub + 1) << magnitude) - 1) / self.SCALE
+
+    def percentile(self, p):
+        if not self.count:
+            return 0.0
+        target = max(1, int(self.count * p / 100 + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self._upper_value(index), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+            'negative': self.negative,
+            'overflow': self.overflow,
+        }
+
+
+class Telemetry:
+    """
+    Số đo hiệu năng của pipeline: histogram độ trễ / kích thước, bộ đếm (kèm tốc độ/giây) và gauge
+    Khi tắt, mọi hàm ghi trả về ngay (chỉ một phép kiểm tra cờ), không cấp phát gì.
+    Tên số đo dạng 'nhóm.tên', vd 'inference.batch_ms', 'queue.processing'.
+    """
+
+    def __init__(self, enabled=False, dump_path=None, dump_interval=10.0):
+        self.enabled = enabled
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self._rate_base = {}  # counter -> (thời điểm, giá trị) lần snapshot trước
+        self._lock = threading.Lock()
+        self._scheduler = None
+
+    @classmethod
+    def from_config(cls):
+        telemetry_config = config.config.get('telemetry', {})
+        return cls(
+            enabled=telemetry_config.get('enabled', False),
+            dump_path=telemetry_config.get('dump_path'),
+            dump_interval=telemetry_config.get('dump_interval_s', 10),
+        )
+
+    def record(self, name, value):
+        """Ghi một giá trị vào histogram name (độ trễ tính bằng ms)"""
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        histogram.record(value)
+
+    def record_since(self, name, start):
+        """Ghi thời gian (ms) từ start = time.perf_counter()"""
+        if self.enabled:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        if not self.enabled:
+            return
+        self.gauges[name] = value
+
+    def snapshot(self):
+        """Trạng thái hiện tại dạng dict (histogram tóm tắt theo percentile, counter kèm tốc độ/giây)"""
+        now = time.monotonic()
+        counters = {}
+        for name, value in list(self.counters.items()):
+            last_time, last_value = self._rate_base.get(name, (now, value))
+            elapsed = now - last_time
+            counters[name] = {'total': value, 'rate': (value - last_value) / elapsed if elapsed > 0 else 0.0}
+            self._rate_base[name] = (now, value)
+        return {
+            'time': time.time(),
+            'histograms': {name: h.summary() for name, h in list(self.histograms.items())},
+            'counters': counters,
+            'gauges': dict(self.gauges),
+        }
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+            self._rate_base.clear()
+
+    def start_dump(self, path=None, interval=None):
+        """Ghi snapshot ra file JSON định kỳ (bỏ qua nếu telemetry tắt hoặc không có đường dẫn)"""
+        self.dump_path = path or self.dump_path
+        self.dump_interval = interval or self.dump_interval
+        if not self.enabled or not self.dump_path or self._scheduler is not None:
+            return
+        from core.scheduler import EventScheduler
+        self._scheduler = EventScheduler(name="TelemetryDump")
+        self._scheduler.call_later(self.dump_interval, self._dump_periodic)
+
+    def _dump_periodic(self):
+        self.dump()
+        if self._scheduler is not None:
+            self._scheduler.call_later(self.dump_interval, self._dump_periodic)
+
+    def dump(self, path=None):
+        path = path or self.dump_path
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(self.snapshot(), file, indent=2)
+        os.replace(tmp_path, path)
+
+    def stop_dump(self):
+        """Dừng ghi định kỳ và ghi snapshot cuối"""
+        scheduler, self._scheduler = self._scheduler, None
+        if scheduler is None:
+            return
+        scheduler.stop()
+        self.dump()
+
+
+telemetry = Telemetry.from_config()
@@ -0,0 +1,158 @@
+from collections import deque
+
+
+class SlidingWindowStats:
+    """
+    Cửa sổ trượt kích thước cố định với thống kê cập nhật O(1) mỗi lần push
+    Giữ tổng, tổng bình phương và EMA chạy, không phải duyệt lại cả cửa sổ mỗi frame.
+    """
+
+    # Sau số lần push này thì tính lại tổng từ buffer để tránh sai số float tích luỹ
+    RESYNC_INTERVAL = 10000
+
+    def __init__(self, maxlen, ema_alpha=0.1):
+        self.maxlen = int(maxlen)
+        self.ema_alpha = ema_alpha
+        self._buffer = [0.0] * self.maxlen
+        self.clear()
+
+    def clear(self):
+        self._head = 0  # vị trí ghi tiếp theo
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._pushes = 0
+        self.ema = 0.0
+
+    def push(self, value):
+        value = float(value)
+        if self._count == self.maxlen:
+            old = self._buffer[self._head]
+            self._sum -= old
+            self._sum_sq -= old * old
+        else:
+            self._count += 1
+        self._buffer[self._head] = value
+        self._head = (self._head + 1) % self.maxlen
+        self._sum += value
+        self._sum_sq += value * value
+
+        self.ema = value if self._count == 1 else self.ema + self.ema_alpha * (value - self.ema)
+
+        self._pushes += 1
+        if self._pushes % self.RESYNC_INTERVAL == 0:
+            self._resync()
+
+    # Giữ tên giống deque để thay thế trực tiếp
+    append = push
+
+    def _resync(self):
+        values = self.values()
+        self._sum = sum(values)
+        self._sum_sq = sum(v * v for v in values)
+
+    def values(self):
+        """Các giá trị trong cửa sổ theo thứ tự cũ -> mới (O(n), chỉ dùng khi cần)"""
+        if self._count < self.maxlen:
+            return self._buffer[:self._count]
+        return self._buffer[self._head:] + self._buffer[:self._head]
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def full(self):
+        return self._count == self.maxlen
+
+    @property
+    def sum(self):
+        return self._sum
+
+    @property
+    def mean(self):
+        """Trung bình (với cửa sổ 0/1 chính là tỷ lệ)"""
+        return self._sum / self._count if self._count else 0.0
+
+    ratio = mean
+
+    @property
+    def variance(self):
+        """Phương sai (population) của cửa sổ"""
+        if not self._count:
+            return 0.0
+        mean = self._sum / self._count
+        return max(self._sum_sq / self._count - mean * mean, 0.0)
+
+
+class TimeWindowStats:
+    """
+    Cửa sổ trượt theo thời gian (giây) với thống kê cập nhật O(1) khấu hao
+    Mỗi mẫu gắn timestamp của frame; mẫu cũ hơn window_seconds so với mẫu mới nhất bị loại,
+    nên cửa sổ luôn phủ đúng khoảng thời gian thực bất kể model chạy được bao nhiêu FPS.
+    """
+
+    def __init__(self, window_seconds, ema_alpha=0.1):
+        self.window_seconds = float(window_seconds)
+        self.ema_alpha = ema_alpha
+        self._samples = deque()  # (timestamp, value)
+        self.clear()
+
+    def clear(self):
+        self._samples.clear()
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._pushes = 0
+        self.ema = 0.0
+
+    def push(self, timestamp, value):
+        value = float(value)
+        self._samples.append((timestamp, value))
+        self._sum += value
+        self._sum_sq += value * value
+        self.ema = value if len(self._samples) == 1 else self.ema + self.ema_alpha * (value - self.ema)
+        self._evict(timestamp)
+
+        self._pushes += 1
+        if self._pushes % SlidingWindowStats.RESYNC_INTERVAL == 0:
+            self._sum = sum(v for _, v in self._samples)
+            self._sum_sq = sum(v * v for _, v in self._samples)
+
+    def _evict(self, now):
+        oldest_allowed = now - self.window_seconds
+        samples = self._samples
+        while samples and samples[0][0] <= oldest_allowed:
+            _, old = samples.popleft()
+            self._sum -= old
+            self._sum_sq -= old * old
+
+    def values(self):
+        return [v for _, v in self._samples]
+
+    def __len__(self):
+        return len(self._samples)
+
+    @property
+    def span(self):
+        """Khoảng thời gian (giây) giữa mẫu cũ nhất và mới nhất trong cửa sổ"""
+        if len(self._samples) < 2:
+            return 0.0
+        return self._samples[-1][0] - self._samples[0][0]
+
+    @property
+    def sum(self):
+        return self._sum
+
+    @property
+    def mean(self):
+        count = len(self._samples)
+        return self._sum / count if count else 0.0
+
+    ratio = mean
+
+    @property
+    def variance(self):
+        count = len(self._samples)
+        if not count:
+            return 0.0
+        mean = self._sum / count
+        return max(self._sum_sq / count - mean * mean, 0.0)
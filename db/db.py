@@ -1,9 +1,79 @@
 import sqlite3
+import threading
+import core.config as config
+
+_db_config = config.config.get('database', {})
+
+DB_PATH = _db_config.get('path', "app.db")
+
+_local = threading.local()
+_connections = {}  # thread -> connection, để đóng hết khi tắt ứng dụng
+_lock = threading.Lock()
+
+
+def _open_connection(path):
+    """
+    Mở kết nối mới và đặt các PRAGMA
+    WAL: người đọc (GUI) không chặn người ghi (thread lưu clip) và ngược lại; ghi-ghi chờ tối đa busy_timeout.
+    """
+    conn = sqlite3.connect(
+        path,
+        timeout=_db_config.get('busy_timeout_ms', 5000) / 1000,
+        check_same_thread=False,  # close_all() đóng từ thread chính
+        cached_statements=_db_config.get('cached_statements', 256),
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA cache_size={-int(_db_config.get('cache_size_kb', 8192))}")
+    conn.execute(f"PRAGMA busy_timeout={int(_db_config.get('busy_timeout_ms', 5000))}")
+    return conn
+
+
+def _is_open(conn):
+    try:
+        conn.total_changes
+        return True
+    except sqlite3.ProgrammingError:  # caller đã conn.close()
+        return False
 
-DB_PATH = "app.db"
 
 def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  
-    print("Load config database successfull")
+    """
+    Kết nối SQLite của thread hiện tại (mỗi thread một kết nối, dùng lại giữa các lần gọi)
+    Dùng `with get_connection() as conn:` để commit/rollback; không cần đóng - close_all() đóng khi tắt ứng dụng.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.path == DB_PATH and _is_open(conn):
+        return conn
+
+    conn = _open_connection(DB_PATH)
+    _local.conn, _local.path = conn, DB_PATH
+    with _lock:
+        old = _connections.get(threading.current_thread())
+        _connections[threading.current_thread()] = conn
+        # Đóng kết nối của các thread đã kết thúc
+        for thread in [t for t in _connections if not t.is_alive()]:
+            _close(_connections.pop(thread))
+    if old is not None:
+        _close(old)
     return conn
+
+
+def _close(conn):
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def close_all():
+    """Đóng mọi kết nối đã mở (gọi một lần khi tắt ứng dụng, sau khi các thread ghi DB đã dừng)"""
+    with _lock:
+        connections = list(_connections.values())
+        _connections.clear()
+    for conn in connections:
+        _close(conn)
+    _local.conn = None
+    print(f"💾 Đã đóng {len(connections)} kết nối database")
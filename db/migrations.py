@@ -0,0 +1,101 @@
+"""
+Migration schema SQLite theo phiên bản (PRAGMA user_version)
+
+Mỗi migration chạy trong một transaction cùng với việc tăng user_version, nên chạy lại nhiều lần
+(hoặc trên app.db cũ có user_version = 0 nhưng đã có bảng) đều an toàn.
+Thêm migration mới: viết hàm nhận conn và thêm vào cuối MIGRATIONS, không sửa migration đã phát hành.
+
+    python -m db.migrations            # nâng cấp app.db lên phiên bản mới nhất
+"""
+from db.db import get_connection
+from db.schema import TABLES
+
+
+def _create_tables(conn):
+    for statement in TABLES:
+        conn.execute(statement)
+
+
+def _add_indexes(conn):
+    """Index cho các truy vấn thường dùng của repository / statistics"""
+    statements = [
+        # frame_repo.get_frames_by_video: WHERE drowsyVideoID = ? ORDER BY createdAt, ID
+        # Covering index: chứa đủ các cột được SELECT nên đọc frame của một clip không phải tra bảng Frame
+        "CREATE INDEX IF NOT EXISTS idx_frame_video_created"
+        " ON Frame(drowsyVideoID, createdAt, ID, confidenceScore, modelPrediction, imageURL)",
+        # frame_repo.get_frames_by_dataset, dataset_repo.count_dataset_frames: WHERE datasetID = ? ORDER BY createdAt
+        "CREATE INDEX IF NOT EXISTS idx_frame_dataset_created ON Frame(datasetID, createdAt)",
+        # DrowsyVideo JOIN Session WHERE Session.userID = ? / session_repo: WHERE userID = ? ORDER BY startTime
+        "CREATE INDEX IF NOT EXISTS idx_session_user_start ON Session(userID, startTime)",
+        # ... JOIN theo sessionID, ORDER BY DrowsyVideo.startTime
+        "CREATE INDEX IF NOT EXISTS idx_drowsyvideo_session_start ON DrowsyVideo(sessionID, startTime)",
+        # drowsy_video_repo: WHERE endTime = ? / WHERE startTime = ?
+        "CREATE INDEX IF NOT EXISTS idx_drowsyvideo_end ON DrowsyVideo(endTime)",
+        "CREATE INDEX IF NOT EXISTS idx_drowsyvideo_start ON DrowsyVideo(startTime)",
+        # weight_repo: WHERE userID = ? AND isCurrentlyUse = 1 / ORDER BY createdAt
+        "CREATE INDEX IF NOT EXISTS idx_weight_user_current ON Weight(userID, isCurrentlyUse, createdAt)",
+        # dataset_repo: WHERE userID = ? AND status = 'SPENDING' ORDER BY createdAt
+        "CREATE INDEX IF NOT EXISTS idx_dataset_user_status ON Dataset(userID, status, createdAt)",
+        # user_repo: WHERE userName = ? (đăng nhập, kiểm tra trùng tên)
+        "CREATE INDEX IF NOT EXISTS idx_user_username ON User(userName)",
+    ]
+    for statement in statements:
+        conn.execute(statement)
+    conn.execute("ANALYZE")
+
+
+def _fix_drowsy_video_label(conn):
+    """
+    Sửa lệch schema DrowsyVideo: code cũ ghi cột isLabel (không có trong schema),
+    DB tạo từ bản cũ có thể thiếu userChoiceLabel
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(DrowsyVideo)")}
+    if 'userChoiceLabel' not in columns:
+        conn.execute("ALTER TABLE DrowsyVideo ADD COLUMN userChoiceLabel BOOLEAN")
+        if 'isLabel' in columns:
+            conn.execute("UPDATE DrowsyVideo SET userChoiceLabel = isLabel WHERE isLabel IS NOT NULL")
+
+
+# (phiên bản, mô tả, hàm) - phiên bản tăng dần từ 1
+MIGRATIONS = [
+    (1, "Tạo bảng", _create_tables),
+    (2, "Index cho các truy vấn chính", _add_indexes),
+    (3, "Sửa cột nhãn DrowsyVideo", _fix_drowsy_video_label),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn=None):
+    """
+    Áp dụng các migration còn thiếu
+    Returns: phiên bản schema sau khi chạy
+    """
+    conn = conn or get_connection()
+    version = get_version(conn)
+    if version > LATEST_VERSION:
+        print(f"⚠️ Database phiên bản {version} mới hơn ứng dụng ({LATEST_VERSION}), bỏ qua migration")
+        return version
+
+    for target, description, apply in MIGRATIONS:
+        if target <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"🗄️ Migration {target}: {description}")
+        version = target
+    return version
+
+
+if __name__ == '__main__':
+    print(f"✅ Schema phiên bản {migrate()}")
@@ -1,10 +1,6 @@
-from db.db import get_connection
-
-def create_tables():
-    with get_connection() as conn:
-        cursor = conn.cursor()
-
-        cursor.execute("""
+# Schema gốc (phiên bản 1), các thay đổi sau đó nằm trong db/migrations.py
+TABLES = [
+    """
         CREATE TABLE IF NOT EXISTS User (
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
             userName TEXT NOT NULL,
@@ -13,9 +9,8 @@ def create_tables():
             createdAt DATETIME DEFAULT CURRENT_TIMESTAMP,
             isActive BOOLEAN DEFAULT 1
         )
-        """)
-
-        cursor.execute("""
+    """,
+    """
         CREATE TABLE IF NOT EXISTS Dataset (
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
             userID INTEGER NOT NULL,
@@ -25,9 +20,8 @@ def create_tables():
             createdAt DATETIME DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (userID) REFERENCES User(ID)
         )
-        """)
-
-        cursor.execute("""
+    """,
+    """
         CREATE TABLE IF NOT EXISTS Weight (
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
             userID INTEGER NOT NULL,
@@ -38,9 +32,8 @@ def create_tables():
             FOREIGN KEY (userID) REFERENCES User(ID),
             FOREIGN KEY (datasetID) REFERENCES Dataset(ID)
         )
-        """)
-
-        cursor.execute("""
+    """,
+    """
         CREATE TABLE IF NOT EXISTS Session (
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
             userID INTEGER NOT NULL,
@@ -48,9 +41,8 @@ def create_tables():
             endTime DATETIME,
             FOREIGN KEY (userID) REFERENCES User(ID)
         )
-        """)
-
-        cursor.execute("""
+    """,
+    """
         CREATE TABLE IF NOT EXISTS DrowsyVideo (
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
             sessionID INTEGER NOT NULL,
@@ -59,9 +51,8 @@ def create_tables():
             userChoiceLabel BOOLEAN,
             FOREIGN KEY (sessionID) REFERENCES Session(ID)
         )
-        """)
-
-        cursor.execute("""
+    """,
+    """
         CREATE TABLE IF NOT EXISTS Frame (
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
             drowsyVideoID INTEGER NOT NULL,
@@ -73,7 +64,12 @@ def create_tables():
             FOREIGN KEY (drowsyVideoID) REFERENCES DrowsyVideo(ID),
             FOREIGN KEY (datasetID) REFERENCES Dataset(ID)
         )
-        """)
+    """,
+]
 
-        conn.commit()
-        print("✅ All tables created successfully.")
+
+def create_tables():
+    """Tạo bảng và áp dụng các migration (index, sửa schema) - xem db/migrations.py"""
+    from db.migrations import migrate
+    migrate()
+    print("✅ All tables created successfully.")
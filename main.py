@@ -13,6 +13,9 @@ from views.LoginView import LoginView
 from views.register_view import RegisterView
 from views.DashboardView import DashboardView
 from utils.sound_manager import cleanup_sound_manager
+from db.db import close_all
+from db.migrations import migrate
+from repository.frame_writer import frame_writer
 from services.session_service import SessionService
 
 
@@ -199,10 +202,6 @@ class MainWindow(QMainWindow):
             print("🔇 Đang dừng âm thanh...")
             cleanup_sound_manager()
 
-            # Đóng database
-            # print("💾 Đang đóng database...")
-            # self.db.close()
-
             print("✅ Đã đóng an toàn\n")
             if hasattr(self.dashboard_view, 'camera_thread') and self.dashboard_view.camera_thread:
                 self.dashboard_view.stop_monitoring()
@@ -212,6 +211,10 @@ class MainWindow(QMainWindow):
                 print("🧾 Kết thúc session...")
                 self.session_service.end_session()
 
+            # Đóng database (sau khi camera / session đã ghi xong): ghi nốt Frame đang chờ rồi đóng kết nối
+            frame_writer.close()
+            close_all()
+
         except Exception as e:
             print(f"⚠️ Lỗi khi đóng: {e}")
         event.accept()
@@ -227,6 +230,9 @@ def main():
     print()
 
     try:
+        # Tạo bảng / nâng cấp schema (index...) trước khi mở giao diện
+        migrate()
+
         window = MainWindow()
         window.show()
 
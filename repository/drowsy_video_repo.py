@@ -98,13 +98,17 @@ def update_user_choice_by_id(id: int, user_choice: bool):
         return 0
 
 
-def create_drowsy_video(session_id: int, start_time: datetime, end_time: datetime):
+def create_drowsy_video(session_id: int, start_time: str, end_time: str):
+    """
+    Tạo DrowsyVideo cho một clip cảnh báo (chưa gán nhãn: userChoiceLabel = NULL)
+    start_time, end_time định dạng '%Y%m%d_%H%M%S'
+    """
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-                       INSERT INTO DrowsyVideo (sessionID, startTime, isLabel, endTime)
-                       VALUES (?, ?, 0, ?)
-                       """, (session_id, start_time.format(), end_time))
+                       INSERT INTO DrowsyVideo (sessionID, startTime, endTime, userChoiceLabel)
+                       VALUES (?, ?, ?, NULL)
+                       """, (session_id, start_time, end_time))
         conn.commit()
         return cursor.lastrowid
 
@@ -1,16 +1,28 @@
 from db.db import get_connection
+from repository.frame_writer import frame_writer
 from datetime import datetime
 
 def insert_frame(drowsy_video_id: int, confidence: float, prediction: bool, image_path: str):
-    """Insert a frame into the Frame table (datasetID luôn NULL)."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO Frame (drowsyVideoID, confidenceScore, modelPrediction, imageURL, datasetID, createdAt)
-            VALUES (?, ?, ?, ?, NULL, ?)
-        """, (drowsy_video_id, confidence, prediction, image_path, datetime.now().isoformat()))
-        conn.commit()
-        return cursor.lastrowid
+    """Insert a frame into the Frame table (datasetID luôn NULL), chờ tới khi đã ghi. Returns: ID"""
+    future = frame_writer.submit(drowsy_video_id, confidence, prediction, image_path,
+                                 created_at=datetime.now().isoformat())
+    frame_writer.flush()  # caller chờ kết quả: ghi ngay thay vì đợi max_delay
+    return future.result()
+
+def insert_frames(drowsy_video_id: int, rows):
+    """
+    Insert nhiều frame của cùng một video trong một transaction (datasetID luôn NULL), chờ tới khi đã ghi.
+    rows: iterable (confidence, prediction, image_path, created_at)
+    Returns: list ID theo thứ tự rows
+    """
+    futures = submit_frames(drowsy_video_id, rows)
+    frame_writer.flush()
+    return [future.result() for future in futures]
+
+def submit_frames(drowsy_video_id: int, rows):
+    """Như insert_frames nhưng không chờ. Returns: list Future -> ID"""
+    return frame_writer.submit_many((drowsy_video_id, confidence, prediction, image_path, None, created_at)
+                                    for confidence, prediction, image_path, created_at in rows)
 
 def get_frames_by_video(video_id: int):
     """Retrieve all frames for a given video."""
@@ -19,7 +31,7 @@ def get_frames_by_video(video_id: int):
             SELECT ID, confidenceScore, modelPrediction, imageURL, createdAt
             FROM Frame
             WHERE drowsyVideoID = ?
-            ORDER BY createdAt ASC
+            ORDER BY createdAt ASC, ID ASC
         """, (video_id,))
         return cursor.fetchall()
 
@@ -40,19 +52,17 @@ def get_high_confidence_frames(drowsy_video_id: int, threshold: float = 0.7):
         return cursor.fetchall()
 
 def insert_frame_to_dataset(frame, dataset_id: int):
-    """Chèn frame vào dataset (tạo bản sao của frame với datasetID mới)."""
-    with get_connection() as conn:
-        conn.execute("""
-            INSERT INTO Frame (drowsyVideoID, confidenceScore, modelPrediction, imageURL, datasetID)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            frame["drowsyVideoID"],
-            frame["confidenceScore"],
-            frame["modelPrediction"],
-            frame["imageURL"],
-            dataset_id
-        ))
-        conn.commit()
+    """Chèn frame vào dataset (tạo bản sao của frame với datasetID mới). Returns: ID"""
+    return insert_frames_to_dataset([frame], dataset_id)[0]
+
+def insert_frames_to_dataset(frames, dataset_id: int):
+    """Chèn nhiều frame vào dataset trong một transaction, chờ tới khi đã ghi. Returns: list ID"""
+    futures = frame_writer.submit_many(
+        (frame["drowsyVideoID"], frame["confidenceScore"], frame["modelPrediction"], frame["imageURL"], dataset_id, None)
+        for frame in frames
+    )
+    frame_writer.flush()
+    return [future.result() for future in futures]
 
 def get_frames_by_dataset(dataset_id: int):
     """
@@ -0,0 +1,142 @@
+import threading
+import time
+from concurrent.futures import Future
+import core.config as config
+from db.db import get_connection
+from core.telemetry import telemetry
+
+
+class FrameWriter:
+    """
+    Ghi Frame kiểu write-behind: nhận dòng từ mọi thread, gom lại và ghi trên một thread riêng
+    Mỗi lần flush là một transaction (BEGIN IMMEDIATE + executemany + COMMIT) -> một lần fsync cho cả lô.
+    Flush khi đủ max_rows dòng, khi dòng cũ nhất đã chờ max_delay giây, hoặc khi gọi flush().
+    submit() trả về Future -> ID của dòng, hoàn thành khi dòng đã commit (chờ .result() để chắc chắn đã ghi).
+    """
+
+    COLUMNS = "(drowsyVideoID, confidenceScore, modelPrediction, imageURL, datasetID, createdAt)"
+
+    def __init__(self, max_rows=256, max_delay=0.2):
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._pending = []  # (row, future)
+        self._oldest = None  # thời điểm dòng cũ nhất trong _pending được thêm
+        self._flush_requested = False
+        self._running = True
+        self._cond = threading.Condition()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls):
+        writer_config = config.config.get('database', {}).get('frame_writer', {})
+        return cls(
+            max_rows=writer_config.get('max_rows', 256),
+            max_delay=writer_config.get('max_delay_ms', 200) / 1000,
+        )
+
+    def submit(self, drowsy_video_id, confidence, prediction, image_path, created_at=None, dataset_id=None):
+        """Đưa một Frame vào hàng đợi ghi (created_at None -> CURRENT_TIMESTAMP). Returns: Future -> ID"""
+        return self.submit_many([(drowsy_video_id, confidence, prediction, image_path, dataset_id, created_at)])[0]
+
+    def submit_many(self, rows):
+        """
+        rows: iterable (drowsyVideoID, confidence, prediction, image_path, datasetID, created_at)
+        Returns: list Future -> ID theo thứ tự rows (các dòng của một lần gọi luôn nằm chung một transaction)
+        """
+        items = [(tuple(row), Future()) for row in rows]
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("FrameWriter đã đóng")
+            self._start()
+            was_empty = not self._pending
+            if was_empty:
+                self._oldest = time.monotonic()
+            self._pending.extend(items)
+            # Hàng đợi trước đó rỗng: thread ghi đang chờ vô hạn -> đánh thức để hẹn giờ max_delay
+            if was_empty or len(self._pending) >= self.max_rows:
+                self._cond.notify()
+        return [future for _, future in items]
+
+    def flush(self, timeout=None):
+        """Ghi ngay các dòng đang chờ và đợi commit xong. Returns: True nếu đã ghi hết trong timeout"""
+        with self._cond:
+            if not self._pending:
+                return True
+            futures = [future for _, future in self._pending]
+            self._flush_requested = True
+            self._cond.notify()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for future in futures:
+            try:
+                future.exception(None if deadline is None else max(deadline - time.monotonic(), 0))
+            except TimeoutError:
+                return False
+        return True
+
+    def close(self, timeout=10):
+        """Ghi nốt các dòng đang chờ rồi dừng thread ghi"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="FrameWriter", daemon=True)
+            self._thread.start()
+
+    def _take_batch(self):
+        """Chờ tới khi cần flush. Returns: list (row, future) hoặc None khi đã dừng và hết dòng"""
+        with self._cond:
+            while True:
+                if self._pending:
+                    due = self._oldest + self.max_delay
+                    now = time.monotonic()
+                    if len(self._pending) >= self.max_rows or self._flush_requested or not self._running or now >= due:
+                        # Không tách lô: giữ nguyên nhóm của submit_many trong một transaction
+                        batch, self._pending = self._pending, []
+                        self._flush_requested = False
+                        return batch
+                    self._cond.wait(due - now)
+                elif not self._running:
+                    return None
+                else:
+                    self._cond.wait()
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            self._write(batch)
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        conn = get_connection()
+        try:
+            # Khoá ghi từ đầu transaction: không ai chèn xen vào nên ID của lô là dãy liên tiếp kết thúc ở last_insert_rowid
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(f"""
+                INSERT INTO Frame {self.COLUMNS}
+                VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+            """, [row for row, _ in batch])
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            conn.commit()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            print(f"⚠️ Lỗi khi ghi {len(batch)} frame: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        first_id = last_id - len(batch) + 1
+        for i, (_, future) in enumerate(batch):
+            future.set_result(first_id + i)
+        telemetry.record_since('db.frame_flush_ms', start)
+        telemetry.record('db.frame_flush_rows', len(batch))
+
+
+frame_writer = FrameWriter.from_config()
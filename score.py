@@ -0,0 +1,222 @@
+"""
+Chấm điểm offline các video lái xe đã ghi (không giao diện)
+
+Mỗi video được chia thành các đoạn frame, chạy song song trên nhiều tiến trình (mỗi tiến trình load model một lần).
+Kết quả mỗi video ghi vào <output>/<tên video>.npz gồm:
+    frame_idx, timestamp (giây), class_id, confidence - mỗi frame một dòng
+    class_names
+    event_frame_idx, event_timestamp, event_type - sự kiện cảnh báo giống DrowsinessDetector (0 = alert, 1 = natural)
+
+Ví dụ:
+    python score.py recordings/ --model model/model_1.pt --workers 4 --batch-size 32
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+os.environ['OPENCV_LOG_LEVEL'] = 'ERROR'
+
+import cv2
+import numpy as np
+import core.config as config
+from core.alert_state import AlertStateMachine
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov')
+EVENT_TYPES = {AlertStateMachine.ALERT: 0, AlertStateMachine.NATURAL: 1}
+
+_model = None  # backend của tiến trình con
+_face_roi = False
+
+
+def _init_worker(model_path, backend, batch_size, face_roi, threads):
+    """Khởi tạo tiến trình con: load model một lần, giới hạn số thread để các tiến trình không tranh CPU"""
+    global _model, _face_roi
+    import torch
+    from core.inference_backend import create_backend
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+    _model = create_backend(model_path, backend=backend, batch_size=batch_size)
+    _face_roi = face_roi
+
+
+def score_chunk(path, start, end, batch_size):
+    """
+    Phân loại các frame [start, end) của một video
+    Returns: (path, frame_idx int32, class_id int16, confidence float32)
+    """
+    from core.face_roi import FaceRoiTracker
+    tracker = FaceRoiTracker() if _face_roi else None
+
+    capture = cv2.VideoCapture(path)
+    if start:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+    frame_idx, class_ids, confidences = [], [], []
+    batch, batch_idx = [], []
+
+    def run_batch():
+        ids, confs = _model.predict(batch)
+        frame_idx.extend(batch_idx)
+        class_ids.append(np.asarray(ids, dtype=np.int16))
+        confidences.append(np.asarray(confs, dtype=np.float32))
+        batch.clear()
+        batch_idx.clear()
+
+    index = start
+    while index < end:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        batch.append(tracker.crop(frame) if tracker else frame)
+        batch_idx.append(index)
+        index += 1
+        if len(batch) == batch_size:
+            run_batch()
+    if batch:
+        run_batch()
+    capture.release()
+
+    return (
+        path,
+        np.asarray(frame_idx, dtype=np.int32),
+        np.concatenate(class_ids) if class_ids else np.zeros(0, dtype=np.int16),
+        np.concatenate(confidences) if confidences else np.zeros(0, dtype=np.float32),
+    )
+
+
+def compute_events(timestamps, is_drowsy, confidences, alert_threshold, min_history_seconds):
+    """Chạy AlertStateMachine qua chuỗi kết quả. Returns: list (vị trí, event_type)"""
+    alerts = AlertStateMachine(alert_threshold, min_history_seconds=min_history_seconds)
+    events = []
+    for i in range(len(timestamps)):
+        event = alerts.update(float(timestamps[i]), bool(is_drowsy[i]), float(confidences[i]))
+        if event is not None:
+            events.append((i, EVENT_TYPES[event]))
+    return events
+
+
+def list_videos(input_path):
+    if os.path.isfile(input_path):
+        return [input_path]
+    return sorted(os.path.join(input_path, name) for name in os.listdir(input_path)
+                  if name.lower().endswith(VIDEO_EXTENSIONS))
+
+
+def probe_video(path):
+    capture = cv2.VideoCapture(path)
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    capture.release()
+    return frame_count, fps
+
+
+def parse_args():
+    detector_config = config.config.get('detector', {})
+    parser = argparse.ArgumentParser(description="Chấm điểm offline video lái xe bằng model buồn ngủ")
+    parser.add_argument('input', help="File video hoặc thư mục chứa video")
+    parser.add_argument('--model', required=True, help="File model (.pt), vd model/model_1.pt")
+    parser.add_argument('--output', default='scores', help="Thư mục ghi file .npz")
+    parser.add_argument('--backend', default=detector_config.get('backend', 'torch'))
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--chunk-frames', type=int, default=3000, help="Số frame mỗi đoạn giao cho một tiến trình")
+    parser.add_argument('--face-roi', action='store_true', help="Phân loại trên vùng khuôn mặt")
+    parser.add_argument('--alert-threshold', type=float, default=3)
+    parser.add_argument('--min-history-seconds', type=float, default=detector_config.get('min_history_seconds', 1.0))
+    parser.add_argument('--overwrite', action='store_true', help="Chấm lại cả video đã có kết quả")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.output, exist_ok=True)
+
+    videos = {}
+    for path in list_videos(args.input):
+        output_path = os.path.join(args.output, os.path.splitext(os.path.basename(path))[0] + ".npz")
+        if os.path.exists(output_path) and not args.overwrite:
+            print(f"⏭️ Bỏ qua {path} (đã có {output_path})")
+            continue
+        frame_count, fps = probe_video(path)
+        if frame_count <= 0:
+            print(f"⚠️ Không đọc được {path}")
+            continue
+        videos[path] = {'fps': fps, 'frame_count': frame_count, 'output': output_path, 'chunks': [],
+                        'pending': (frame_count + args.chunk_frames - 1) // args.chunk_frames}
+    if not videos:
+        sys.exit("❌ Không có video nào cần chấm")
+
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    print(f"🚀 Chấm {len(videos)} video với {args.workers} tiến trình x {threads} thread, batch {args.batch_size}")
+    started = time.perf_counter()
+    total_frames = 0
+
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                             initargs=(args.model, args.backend, args.batch_size, args.face_roi, threads)) as pool:
+        jobs = []
+        for path, info in videos.items():
+            for start in range(0, info['frame_count'], args.chunk_frames):
+                end = min(start + args.chunk_frames, info['frame_count'])
+                jobs.append(pool.submit(score_chunk, path, start, end, args.batch_size))
+
+        class_names = None
+        for job in as_completed(jobs):
+            path, frame_idx, class_ids, confidences = job.result()
+            info = videos[path]
+            info['chunks'].append((frame_idx, class_ids, confidences))
+            info['pending'] -= 1
+            total_frames += len(frame_idx)
+            if info['pending']:
+                continue
+
+            if class_names is None:
+                class_names = _class_names(args.model)
+            _write_result(path, info, class_names, args)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Xong {total_frames} frame trong {elapsed:.1f}s ({total_frames / max(elapsed, 1e-6):.1f} FPS)")
+
+
+def _class_names(model_path):
+    """Tên class theo thứ tự id, đọc từ checkpoint (không cần load backend ở tiến trình chính)"""
+    from ultralytics import YOLO
+    names = YOLO(model_path).names
+    return [names[i] for i in sorted(names)]
+
+
+def _write_result(path, info, class_names, args):
+    """Ghép các đoạn theo thứ tự frame, tính sự kiện cảnh báo và ghi .npz"""
+    chunks = sorted(info.pop('chunks'), key=lambda chunk: chunk[0][0] if len(chunk[0]) else 0)
+    frame_idx = np.concatenate([chunk[0] for chunk in chunks])
+    class_ids = np.concatenate([chunk[1] for chunk in chunks])
+    confidences = np.concatenate([chunk[2] for chunk in chunks])
+    timestamps = frame_idx / info['fps']
+
+    drowsy_ids = [i for i, name in enumerate(class_names) if name.lower() == 'drowsy']
+    is_drowsy = np.isin(class_ids, drowsy_ids)
+    events = compute_events(timestamps, is_drowsy, confidences, args.alert_threshold, args.min_history_seconds)
+    positions = np.asarray([i for i, _ in events], dtype=np.int64)
+
+    np.savez_compressed(
+        info['output'],
+        frame_idx=frame_idx,
+        timestamp=timestamps.astype(np.float64),
+        class_id=class_ids,
+        confidence=confidences,
+        class_names=np.asarray(class_names),
+        event_frame_idx=frame_idx[positions] if len(positions) else np.zeros(0, dtype=np.int32),
+        event_timestamp=timestamps[positions] if len(positions) else np.zeros(0, dtype=np.float64),
+        event_type=np.asarray([t for _, t in events], dtype=np.int8),
+        fps=np.float64(info['fps']),
+    )
+    alert_count = sum(1 for _, t in events if t == EVENT_TYPES[AlertStateMachine.ALERT])
+    print(f"💾 {path}: {len(frame_idx)} frame, drowsy {is_drowsy.mean() * 100:.1f}%, "
+          f"{alert_count} cảnh báo -> {info['output']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Chế độ server giám sát nhiều camera cùng lúc (không giao diện)
+
+Ví dụ:
+    python server.py --stream cab1=0 --stream cab2=rtsp://192.168.1.20/stream --model model/model_1.pt
+Hoặc khai báo trong config.json:
+    "server": {"streams": [{"name": "cab1", "source": 0, "model": "model/model_1.pt"}, ...]}
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+os.environ['OPENCV_LOG_LEVEL'] = 'ERROR'
+
+import core.config as config
+from core.stream_server import CameraStream, DetectionServer
+
+
+def parse_args():
+    server_config = config.config.get('server', {})
+    detector_config = config.config.get('detector', {})
+    parser = argparse.ArgumentParser(description="Server phát hiện buồn ngủ cho nhiều camera")
+    parser.add_argument('--stream', action='append', default=[], metavar='NAME=SOURCE',
+                        help="Nguồn video (chỉ số camera, RTSP URL hoặc file), lặp lại cho nhiều luồng")
+    parser.add_argument('--model', default=server_config.get('model'),
+                        help="Model mặc định cho các luồng không khai báo model riêng")
+    parser.add_argument('--backend', default=detector_config.get('backend', 'torch'))
+    parser.add_argument('--batch-size', type=int, default=server_config.get('batch_size', 8))
+    parser.add_argument('--queue-depth', type=int, default=server_config.get('queue_depth', 2),
+                        help="Số frame chờ tối đa của mỗi luồng (đầy thì bỏ frame cũ nhất)")
+    parser.add_argument('--alert-threshold', type=float, default=server_config.get('alert_threshold', 3))
+    parser.add_argument('--fast-preprocess', action='store_true',
+                        default=detector_config.get('fast_preprocess', False),
+                        help="Tiền xử lý bằng cv2 + forward trực tiếp (nhanh hơn, không khớp tuyệt đối ultralytics)")
+    parser.add_argument('--report-interval', type=float, default=server_config.get('report_interval', 5))
+    return parser.parse_args()
+
+
+def build_streams(args):
+    streams = []
+    for spec in config.config.get('server', {}).get('streams', []):
+        streams.append((spec['name'], spec['source'], spec.get('model', args.model)))
+    for item in args.stream:
+        name, sep, source = item.partition('=')
+        if not sep:
+            name, source = f"stream{len(streams)}", item
+        streams.append((name, source, args.model))
+
+    for name, source, model in streams:
+        if not model:
+            sys.exit(f"❌ Luồng {name} chưa có model (dùng --model hoặc 'model' trong config)")
+    return streams
+
+
+def print_report(report):
+    print(f"\n{'Luồng':<12}{'Cap FPS':>9}{'Inf FPS':>9}{'Trễ ms':>9}{'Max ms':>9}{'Bỏ':>7}{'Drowsy':>8}{'Alert':>7}  Trạng thái")
+    for row in report:
+        state = "đã dừng" if row['finished'] else row['class']
+        print(f"{row['stream']:<12}{row['capture_fps']:>9.1f}{row['inference_fps']:>9.1f}"
+              f"{row['latency_ms']:>9.1f}{row['latency_max_ms']:>9.1f}{row['dropped']:>7}"
+              f"{row['drowsy_ratio'] * 100:>7.0f}%{row['alerts']:>7}  {state}")
+
+
+def on_alert(stream, record, drowsy_ratio, avg_conf):
+    when = stream.clock.format(record.ts_ns, "%Y-%m-%d %H:%M:%S")
+    print(f"🚨 [{stream.name}] {when} - Cảnh báo buồn ngủ (drowsy {drowsy_ratio * 100:.0f}%, conf {avg_conf:.2f})")
+
+
+def main():
+    args = parse_args()
+    streams = build_streams(args)
+    if not streams:
+        sys.exit("❌ Chưa khai báo luồng nào (--stream NAME=SOURCE)")
+
+    server = DetectionServer(batch_size=args.batch_size, backend=args.backend, fast_preprocess=args.fast_preprocess,
+                             queue_depth=args.queue_depth, on_alert=on_alert)
+    for name, source, model in streams:
+        server.add_stream(CameraStream(name, source, model, alert_threshold=args.alert_threshold))
+
+    print(f"🚀 Bắt đầu giám sát {len(streams)} luồng, {len(set(model for _, _, model in streams))} model")
+    server.start()
+    try:
+        while not server.all_finished():
+            time.sleep(args.report_interval)
+            print_report(server.report())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print_report(server.report())
+
+
+if __name__ == '__main__':
+    main()
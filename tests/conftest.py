@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Chạy test từ thư mục gốc repo: import core/, utils/, repository/... như main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,43 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("numpy")
+
+from utils.camera_config import CaptureNegotiator, SyntheticCapture, fourcc_to_str
+
+
+def negotiate(modes):
+    capture = SyntheticCapture(modes, width=160, height=120, fps=60)
+    negotiator = CaptureNegotiator(frame_width=160, frame_height=120, fps=60, probe_frames=8)
+    mode = negotiator.configure(capture)
+    return capture, mode
+
+
+def test_faster_mode_is_accepted():
+    capture, mode = negotiate({'YUYV': 15, 'MJPG': 60})
+    assert mode.fourcc == 'MJPG'
+    assert fourcc_to_str(capture.get(cv2.CAP_PROP_FOURCC)) == 'MJPG'
+    assert (mode.width, mode.height) == (160, 120)
+    assert mode.measured_fps > 15 * CaptureNegotiator.MIN_GAIN
+
+
+def test_mode_rejected_by_driver_keeps_default():
+    # Driver không nhận MJPG (set trả về False): giữ chế độ mặc định
+    capture, mode = negotiate({'YUYV': 30})
+    assert mode.fourcc == 'YUYV'
+    assert fourcc_to_str(capture.get(cv2.CAP_PROP_FOURCC)) == 'YUYV'
+
+
+def test_slower_mode_falls_back_to_previous():
+    capture, mode = negotiate({'YUYV': 60, 'MJPG': 15})
+    assert mode.fourcc == 'YUYV'
+    assert fourcc_to_str(capture.get(cv2.CAP_PROP_FOURCC)) == 'YUYV'
+    assert capture.get(cv2.CAP_PROP_FPS) == 60
+
+
+def test_slower_mode_falls_back_to_default_without_fourcc():
+    # Chế độ mặc định không báo FOURCC: vẫn phải quay lại sau khi thử MJPG chậm hơn
+    capture, mode = negotiate({'': 60, 'MJPG': 15})
+    assert mode.fourcc == ''
+    assert capture.get(cv2.CAP_PROP_FOURCC) == 0.0
+    assert capture.get(cv2.CAP_PROP_FPS) == 60
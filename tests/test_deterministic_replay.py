@@ -0,0 +1,66 @@
+"""Replay deterministic: cùng một bản ghi luôn cho cùng chuỗi trạng thái và sự kiện cảnh báo"""
+import random
+import time
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("ultralytics")
+
+import core.DrowsinessDetector as detector_module
+
+FPS = 30
+# 5 s tỉnh táo, 8 s buồn ngủ, 7 s tỉnh táo
+PATTERN = [False] * (5 * FPS) + [True] * (8 * FPS) + [False] * (7 * FPS)
+
+
+class FakeBackend:
+    """Backend giả: class đọc từ pixel góc dưới phải, thời gian suy luận ngẫu nhiên để xáo trộn timing"""
+
+    names = {0: 'Drowsy', 1: 'Natural'}
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+
+    def predict(self, frames):
+        time.sleep(self.random.uniform(0, 0.004))
+        class_ids = np.array([0 if frame[-1, -1, 0] else 1 for frame in frames], dtype=np.int64)
+        return class_ids, np.full(len(frames), 0.9, dtype=np.float32)
+
+    def close(self):
+        pass
+
+
+def replay(monkeypatch, seed):
+    monkeypatch.setattr(detector_module, 'create_backend', lambda *args, **kwargs: FakeBackend(seed))
+    alerts, saves, statuses = [], [], []
+    detector = detector_module.DrowsinessDetector(
+        'unused.pt', batch_size=4, alert_threshold=1, min_history_seconds=0.5,
+        callback=lambda frame, ratio, conf: alerts.append((round(ratio, 6), round(conf, 6))),
+        deterministic=True, adaptive_rate=True, face_roi=False, process_worker=False,
+    )
+    detector._request_save = lambda record: saves.append(record.seq)
+    drowsy = np.full((480, 640, 3), 255, dtype=np.uint8)
+    natural = np.zeros((480, 640, 3), dtype=np.uint8)
+    try:
+        for i, is_drowsy in enumerate(PATTERN):
+            frame = (drowsy if is_drowsy else natural).copy()
+            _, status = detector.process_frame(frame, ts_ns=i * 1_000_000_000 // FPS)
+            statuses.append((status['class'], status['alert_active'], round(status['drowsy_ratio'], 9)))
+            if i % 97 == 0:
+                time.sleep(0.01)  # CameraThread / GUI chậm bất thường
+        assert detector.flush()
+    finally:
+        detector.stop()
+    return alerts, saves, statuses
+
+
+def test_replay_is_deterministic(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    first = replay(monkeypatch, seed=1)
+    second = replay(monkeypatch, seed=2)
+
+    alerts, saves, _ = first
+    assert alerts, "bản ghi có 8 s buồn ngủ phải sinh cảnh báo"
+    assert saves
+    assert first == second
@@ -0,0 +1,34 @@
+import math
+from core.telemetry import Histogram
+
+
+def test_percentiles_within_relative_error():
+    histogram = Histogram()
+    for value in range(1, 1001):
+        histogram.record(float(value))
+    assert histogram.count == 1000
+    assert abs(histogram.percentile(50) - 500) <= 500 / Histogram.SUB_BUCKETS
+    assert abs(histogram.percentile(99) - 990) <= 990 / Histogram.SUB_BUCKETS
+
+
+def test_negative_and_out_of_range_samples_are_counted_separately():
+    histogram = Histogram()
+    histogram.record(5.0)
+    histogram.record(-27268.0)
+    histogram.record(math.nan)
+    histogram.record(math.inf)
+    histogram.record(Histogram.MAX_UNITS / Histogram.SCALE)
+
+    summary = histogram.summary()
+    assert summary['count'] == 1
+    assert summary['negative'] == 1
+    assert summary['overflow'] == 3
+    assert summary['min'] == summary['max'] == 5.0
+    assert 4.5 <= summary['p50'] <= 5.0
+
+
+def test_reset_clears_rejected_counts():
+    histogram = Histogram()
+    histogram.record(-1.0)
+    histogram.reset()
+    assert histogram.summary()['negative'] == 0
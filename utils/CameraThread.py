@@ -1,23 +1,51 @@
 from PyQt5.QtCore import QThread, pyqtSignal
-from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtGui import QImage
+import threading
+import time
 import cv2
 import numpy as np
+from core.window_stats import SlidingWindowStats
+from core.telemetry import telemetry
+from utils.frame_mailbox import LatestFrameMailbox
 
 
 class CameraThread(QThread):
-    """Thread xử lý camera và phát hiện buồn ngủ"""
+    """
+    Thread xử lý camera và phát hiện buồn ngủ
+    Nguồn frame là một FrameSource (camera, file video, thư mục ảnh). Đọc nguồn chạy trên một thread riêng, liên tục đặt frame mới nhất vào mailbox;
+    QThread này lấy frame mới nhất, xử lý và hiển thị theo nhịp deadline (không sleep cố định).
+    Frame hiển thị được thu nhỏ một lần về kích thước label vào buffer BGR cấp phát sẵn và gửi dạng QImage
+    Format_BGR888 (không đổi màu, không tạo QPixmap ngoài GUI thread); GUI chưa nhận frame trước thì bỏ frame.
+    """
 
     # Signals
-    frame_ready = pyqtSignal(QPixmap, dict)  # (frame, status_dict)
+    frame_ready = pyqtSignal(QImage, dict)  # (frame BGR888 đã thu nhỏ, status_dict) - gọi frame_consumed() sau khi dùng
     drowsiness_alert = pyqtSignal(float, float)  # (drowsy_ratio, confidence)
     error_occurred = pyqtSignal(str)
+    source_finished = pyqtSignal()  # file video / thư mục ảnh đã phát hết
 
-    def __init__(self, detector, camera_source=0):
+    # Chu kỳ (giây) in thống kê đọc camera
+    LOG_INTERVAL = 30
+
+    def __init__(self, detector, frame_source):
+        """
+        Args:
+            frame_source: FrameSource (camera, file video, thư mục ảnh) - xem utils.frame_source.open_frame_source
+        """
         super().__init__()
         self.detector = detector
-        self.camera_source = camera_source
+        self.source = frame_source
+        self.read_latency_ms = SlidingWindowStats(300)
+        self.frame_interval = 0.0
         self.running = False
-        self.cap = None
+        self.mailbox = LatestFrameMailbox()
+        self.capture_thread = None
+
+        # Đường hiển thị: 2 buffer luân phiên, GUI báo đã nhận frame qua frame_consumed()
+        self.display_size = None  # (width, height) của label, None = giữ nguyên kích thước frame
+        self._display_buffers = [None, None]
+        self._display_index = 0
+        self._display_pending = False
 
         # Set callback cho detector
         self.detector.callback = self._on_drowsiness_detected
@@ -29,52 +57,136 @@ class CameraThread(QThread):
     def run(self):
         """Chạy thread"""
         self.running = True
-        self.cap = cv2.VideoCapture(self.camera_source)
-
-        # Cấu hình camera
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
-
-        if not self.cap.isOpened():
+        if not self.source.open():
             self.error_occurred.emit("Không thể mở camera!")
             return
 
+        if self.source.max_speed:
+            self._run_max_speed()
+        else:
+            self._run_realtime()
+        self._cleanup()
+
+    def _run_realtime(self):
+        """Camera / phát thời gian thực: thread đọc riêng + mailbox, xử lý frame mới nhất theo nhịp deadline"""
+        self.frame_interval = 1.0 / self.source.fps if self.source.fps else 0.0
+        self.mailbox = LatestFrameMailbox()
+        self.capture_thread = threading.Thread(target=self._capture_loop, name="CameraCapture", daemon=True)
+        self.capture_thread.start()
+
+        last_seq = 0
+        deadline = time.monotonic()
+        while self.running:
+            # Lấy frame mới nhất (frame cũ hơn đã bị thay thế trong mailbox)
+            slot = self.mailbox.wait(last_seq, timeout=0.5)
+            if slot is None:
+                continue
+            skipped = slot[0] - last_seq - 1
+            if skipped > 0:
+                telemetry.count('capture.frames_replaced', skipped)  # frame bị frame mới hơn thay trong mailbox
+            last_seq, ts_ns, frame = slot
+
+            # Xử lý frame qua detector (timestamp = thời điểm chụp frame)
+            processed_frame, status = self.detector.process_frame(frame, ts_ns)
+            self._emit_frame(processed_frame, status, ts_ns)
+
+            # Giữ nhịp theo deadline: chỉ ngủ phần còn lại của chu kỳ, trễ thì không dồn frame để đuổi kịp
+            deadline += self.frame_interval
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                deadline = time.monotonic()
+
+    def _run_max_speed(self):
+        """
+        Replay nhanh nhất có thể: đọc và xử lý tuần tự mọi frame, thời gian của detector lấy theo bản ghi
+        Detector chạy ở chế độ deterministic nên cùng bản ghi luôn cho cùng các quyết định cảnh báo.
+        """
+        self.detector.deterministic = True
         while self.running:
-            ret, frame = self.cap.read()
+            ret, frame, ts_ns = self.source.read()
             if not ret:
-                self.error_occurred.emit("Không đọc được frame từ camera!")
                 break
-
-            # Xử lý frame qua detector
-            processed_frame, status = self.detector.process_frame(frame)
-
-            # Convert sang QPixmap
-            pixmap = self._convert_cv_to_pixmap(processed_frame)
-
-            # Emit signal
-            self.frame_ready.emit(pixmap, status)
-
-            # Giảm tải CPU
-            self.msleep(33)  # ~30 FPS
-
-        self._cleanup()
-
-    def _convert_cv_to_pixmap(self, cv_img):
-        """Convert OpenCV image sang QPixmap"""
-        rgb_image = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        return QPixmap.fromImage(qt_image)
+            read_ns = time.monotonic_ns()  # ts_ns là vị trí trong bản ghi, không dùng để đo độ trễ
+            processed_frame, status = self.detector.process_frame(frame, ts_ns)
+            self._emit_frame(processed_frame, status, read_ns)
+        self.detector.flush()
+        if self.running:
+            self.source_finished.emit()
+
+    def _emit_frame(self, processed_frame, status, read_ns):
+        """read_ns: time.monotonic_ns() lúc đọc được frame, mốc đo độ trễ tới lúc hiển thị"""
+        # GUI còn chưa vẽ frame trước: bỏ frame này thay vì xếp hàng signal
+        if self._display_pending:
+            telemetry.count('display.dropped')
+            return
+        self._display_pending = True
+        self.frame_ready.emit(self._to_display_image(processed_frame), status)
+        telemetry.count('display.frames')
+        if telemetry.enabled:
+            telemetry.record('latency.capture_to_display_ms', (time.monotonic_ns() - read_ns) / 1e6)
+
+    def _capture_loop(self):
+        """Vòng đọc nguồn: đọc liên tục để driver không dồn frame cũ, chỉ giữ frame mới nhất"""
+        next_log = time.monotonic() + self.LOG_INTERVAL
+        frames = 0
+        while self.running:
+            start = time.perf_counter()
+            ret, frame, ts_ns = self.source.read()
+            if not ret:
+                if self.source.live:
+                    self.error_occurred.emit("Không đọc được frame từ camera!")
+                else:
+                    self.source_finished.emit()
+                self.running = False
+                break
+            read_ms = (time.perf_counter() - start) * 1000
+            self.read_latency_ms.push(read_ms)
+            telemetry.record('capture.read_ms', read_ms)
+            telemetry.count('capture.frames')
+            self.mailbox.publish(frame, ts_ns)
+
+            frames += 1
+            now = time.monotonic()
+            if now >= next_log:
+                print(f"📷 Camera: {frames / (now - next_log + self.LOG_INTERVAL):.1f} FPS, "
+                      f"read {self.read_latency_ms.mean:.1f} ms (max {max(self.read_latency_ms.values()):.1f} ms)")
+                next_log = now + self.LOG_INTERVAL
+                frames = 0
+        self.mailbox.close()
+
+    def frame_consumed(self, width=None, height=None):
+        """GUI gọi sau khi đã vẽ frame; kèm kích thước label hiện tại để thu nhỏ các frame sau cho vừa"""
+        if width and height:
+            self.display_size = (width, height)
+        self._display_pending = False
+
+    def _to_display_image(self, cv_img):
+        """Thu nhỏ frame BGR vừa label vào buffer luân phiên và bọc bằng QImage (không copy)"""
+        h, w = cv_img.shape[:2]
+        if self.display_size is not None:
+            scale = min(self.display_size[0] / w, self.display_size[1] / h)
+            w, h = max(int(w * scale), 1), max(int(h * scale), 1)
+
+        self._display_index ^= 1
+        buffer = self._display_buffers[self._display_index]
+        if buffer is None or buffer.shape[:2] != (h, w):
+            buffer = np.empty((h, w, 3), dtype=np.uint8)
+            self._display_buffers[self._display_index] = buffer
+        cv2.resize(cv_img, (w, h), dst=buffer, interpolation=cv2.INTER_LINEAR)
+        return QImage(buffer.data, w, h, buffer.strides[0], QImage.Format_BGR888)
 
     def stop(self):
         """Dừng thread"""
         self.running = False
+        self.mailbox.close()
         self.wait(3000)  # Đợi tối đa 3 giây
 
     def _cleanup(self):
         """Dọn dẹp resources"""
-        if self.cap is not None:
-            self.cap.release()
+        self.mailbox.close()
+        if self.capture_thread is not None:
+            self.capture_thread.join(timeout=2)
+            self.capture_thread = None
+        self.source.close()
@@ -1,28 +1,82 @@
 import os
+from datetime import datetime
 import cv2
 from repository.frame_repo import get_frames_by_video
 
 
 class VideoManager:
+    # imageURL của frame nằm trong video: "<đường dẫn mp4>#frame=<chỉ số>"
+    FRAME_URL_MARKER = "#frame="
+
     def __init__(self):
         pass
+
+    @classmethod
+    def frame_url(cls, video_path: str, index: int):
+        return f"{video_path}{cls.FRAME_URL_MARKER}{index}"
+
+    @classmethod
+    def parse_frame_url(cls, image_url: str):
+        """Returns: (video_path, index) nếu imageURL trỏ vào video, ngược lại (None, None)"""
+        video_path, marker, index = image_url.rpartition(cls.FRAME_URL_MARKER)
+        if not marker:
+            return None, None
+        return video_path, int(index)
+
+    @staticmethod
+    def get_video_path(folder_path: str, video_id: int):
+        """Đường dẫn file mp4 của video drowsy, nằm cùng thư mục với các frame"""
+        return os.path.join(folder_path, f"drowsy_video_{video_id}.mp4")
+
+    @staticmethod
+    def clip_fps(count: int, span_s: float, max_fps: float = 30.0):
+        """
+        FPS phát lại của clip từ số frame và khoảng thời gian giữa frame đầu và cuối
+        Khi bật adaptive_rate, clip lấy mẫu thưa (~5 fps) nên ghi theo FPS camera sẽ phát nhanh gấp nhiều lần.
+        Không suy ra được (ít hơn 2 frame / khoảng thời gian 0) thì dùng max_fps; không bao giờ nhanh hơn max_fps.
+        """
+        if count < 2 or span_s <= 0:
+            return max_fps
+        return min(max((count - 1) / span_s, 1.0), max_fps)
+
+    @staticmethod
+    def write_video(frames, video_path: str, fps: float = 30.0):
+        """Ghi video trực tiếp từ các frame trong bộ nhớ (không đọc lại ảnh từ đĩa)"""
+        height, width = frames[0].shape[:2]
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        video = cv2.VideoWriter(video_path, fourcc, fps, (width, height))
+        for frame in frames:
+            video.write(frame)
+        video.release()
+        return video_path
+
     def get_drowsy_video(self, video_id: int):
         """Lấy đối tượng VideoCapture cho video drowsy cụ thể."""
         frames = get_frames_by_video(video_id)
         image_paths = [frame["imageURL"] for frame in frames]
 
+        # Clip ghi trực tiếp ra video: file mp4 đã có sẵn
+        video_path, _ = self.parse_frame_url(image_paths[0])
+        if video_path is not None:
+            return video_path
+
         folder_path = image_paths[0].split("/")[:-1]
-        video_path = os.path.join(*folder_path, f"drowsy_video_{video_id}.mp4")
+        video_path = self.get_video_path(os.path.join(*folder_path), video_id)
         
         if not os.path.exists(video_path):
-            # Tạo video từ các frame
+            # Tạo video từ các frame, FPS theo createdAt (thời điểm chụp) của frame đầu và cuối
+            try:
+                span = datetime.fromisoformat(frames[-1]["createdAt"]) - datetime.fromisoformat(frames[0]["createdAt"])
+                fps = self.clip_fps(len(frames), span.total_seconds())
+            except (TypeError, ValueError):
+                fps = 30.0
             first_frame = cv2.imread(image_paths[0])
             height, width, layers = first_frame.shape
             fourcc = cv2.VideoWriter_fourcc(*'mp4v')
             video = cv2.VideoWriter(
                 video_path,
                 fourcc,
-                30.0, (width, height))
+                fps, (width, height))
             for image_path in image_paths:
                 frame = cv2.imread(image_path)
                 video.write(frame)
@@ -0,0 +1,191 @@
+import time
+from typing import NamedTuple
+import cv2
+import numpy as np
+
+
+def fourcc_to_str(value):
+    """Giá trị CAP_PROP_FOURCC (float) -> chuỗi 4 ký tự, vd 'MJPG'"""
+    code = int(value)
+    if code <= 0:
+        return ""
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00")
+
+
+class CaptureMode(NamedTuple):
+    """Chế độ camera sau khi thiết lập + số đo thực tế"""
+    fourcc: str
+    width: int
+    height: int
+    fps: float  # FPS driver báo cáo
+    measured_fps: float  # FPS đo được khi đọc liên tục
+    read_latency_ms: float  # thời gian trung bình của một lần read()
+
+
+class CaptureNegotiator:
+    """
+    Thiết lập camera theo config (kích thước, FPS, FOURCC) và đo lại thực tế
+    fourcc='auto': thử chế độ mặc định của driver rồi thử MJPG, chỉ chọn MJPG khi đo được FPS cao hơn rõ rệt
+    (nhiều webcam USB ở YUYV chỉ đạt FPS thấp với độ phân giải lớn).
+    Chỉ dùng set/get/read nên chạy được với cv2.VideoCapture (camera hoặc file video) và SyntheticCapture.
+    """
+
+    CANDIDATES = ('MJPG', 'YUYV')
+    MIN_GAIN = 1.15  # MJPG phải nhanh hơn ít nhất 15% mới đổi
+
+    def __init__(self, frame_width=640, frame_height=480, fps=30, fourcc='auto', probe_frames=20):
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.fps = fps
+        self.fourcc = fourcc
+        self.probe_frames = probe_frames
+
+    @classmethod
+    def from_config(cls, camera_config):
+        return cls(
+            frame_width=camera_config.get('frame_width', 640),
+            frame_height=camera_config.get('frame_height', 480),
+            fps=camera_config.get('fps', 30),
+            fourcc=camera_config.get('fourcc', 'auto'),
+            probe_frames=camera_config.get('probe_frames', 20),
+        )
+
+    def configure(self, capture):
+        """Thiết lập capture và trả về CaptureMode đang dùng"""
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        if self.fourcc and self.fourcc != 'auto':
+            self._apply(capture, self.fourcc)
+            mode = self.measure(capture)
+        else:
+            self._apply(capture, None)
+            # Giữ mã FOURCC gốc của driver (có thể là 0 / không đọc được) để quay lại đúng chế độ mặc định
+            mode_code = capture.get(cv2.CAP_PROP_FOURCC)
+            mode = self.measure(capture)
+            for fourcc in self.CANDIDATES:
+                if fourcc == mode.fourcc or not self._apply(capture, fourcc):
+                    continue
+                candidate = self.measure(capture)
+                if candidate.fourcc == fourcc and candidate.measured_fps > mode.measured_fps * self.MIN_GAIN:
+                    mode, mode_code = candidate, capture.get(cv2.CAP_PROP_FOURCC)
+            # Quay lại chế độ tốt nhất nếu lần thử cuối không phải nó (kể cả chế độ mặc định không có FOURCC)
+            if fourcc_to_str(capture.get(cv2.CAP_PROP_FOURCC)) != mode.fourcc:
+                self._apply(capture, mode_code)
+
+        # File video: quay lại frame đầu sau khi đọc thử
+        if capture.get(cv2.CAP_PROP_FRAME_COUNT) > 0:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self._log(mode)
+        return mode
+
+    def _apply(self, capture, fourcc):
+        """
+        Đặt FOURCC (nếu có) rồi đặt lại kích thước / FPS (nhiều driver reset khi đổi FOURCC)
+        fourcc: chuỗi 4 ký tự, mã số CAP_PROP_FOURCC đọc từ capture, hoặc None để giữ nguyên
+        """
+        accepted = True
+        if isinstance(fourcc, str):
+            fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        if fourcc is not None:
+            accepted = bool(capture.set(cv2.CAP_PROP_FOURCC, fourcc))
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_width)
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_height)
+        capture.set(cv2.CAP_PROP_FPS, self.fps)
+        return accepted
+
+    def measure(self, capture):
+        """Đọc probe_frames frame liên tục, đo FPS và độ trễ read()"""
+        read_times = []
+        first_done = None
+        frames = 0
+        shape = None
+        # Frame đầu thường chậm (khởi động stream), không tính vào FPS
+        for i in range(self.probe_frames + 1):
+            start = time.perf_counter()
+            ret, frame = capture.read()
+            end = time.perf_counter()
+            if not ret:
+                break
+            shape = frame.shape
+            if i == 0:
+                first_done = end
+                continue
+            read_times.append(end - start)
+            frames += 1
+
+        measured_fps = frames / (end - first_done) if frames and end > first_done else 0.0
+        height, width = shape[:2] if shape is not None else (
+            int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)))
+        return CaptureMode(
+            fourcc=fourcc_to_str(capture.get(cv2.CAP_PROP_FOURCC)),
+            width=width,
+            height=height,
+            fps=float(capture.get(cv2.CAP_PROP_FPS)),
+            measured_fps=measured_fps,
+            read_latency_ms=float(np.mean(read_times)) * 1000 if read_times else 0.0,
+        )
+
+    def _log(self, mode):
+        print(f"📷 Camera: {mode.fourcc or '?'} {mode.width}x{mode.height} @ {mode.fps:.0f} FPS "
+              f"(đo được {mode.measured_fps:.1f} FPS, read {mode.read_latency_ms:.1f} ms)")
+        if (mode.width, mode.height) != (self.frame_width, self.frame_height):
+            print(f"⚠️ Camera không hỗ trợ {self.frame_width}x{self.frame_height}, đang dùng {mode.width}x{mode.height}")
+        if self.fps and mode.measured_fps and mode.measured_fps < self.fps * 0.8:
+            print(f"⚠️ Camera chỉ đạt {mode.measured_fps:.1f}/{self.fps} FPS")
+
+
+class SyntheticCapture:
+    """
+    Nguồn frame giả lập camera (thay cv2.VideoCapture khi không có camera thật)
+    modes: {fourcc: max_fps}; đọc frame bị giới hạn theo FPS của chế độ đang chọn.
+    fourcc '' là chế độ driver không báo FOURCC (CAP_PROP_FOURCC = 0).
+    """
+
+    def __init__(self, modes=None, width=640, height=480, fps=30):
+        self.modes = modes or {'YUYV': 15, 'MJPG': 30}
+        self.fourcc = next(iter(self.modes))
+        self.props = {
+            cv2.CAP_PROP_FRAME_WIDTH: width,
+            cv2.CAP_PROP_FRAME_HEIGHT: height,
+            cv2.CAP_PROP_FPS: fps,
+            cv2.CAP_PROP_BUFFERSIZE: 1,
+        }
+        self._next_frame = time.monotonic()
+        self._count = 0
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FOURCC:
+            fourcc = fourcc_to_str(value)
+            if fourcc not in self.modes:
+                return False
+            self.fourcc = fourcc
+            return True
+        if prop in self.props:
+            self.props[prop] = value
+            return True
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FOURCC:
+            return float(cv2.VideoWriter_fourcc(*self.fourcc)) if self.fourcc else 0.0
+        if prop == cv2.CAP_PROP_FPS:
+            return float(min(self.props[prop], self.modes[self.fourcc]))
+        return float(self.props.get(prop, 0))
+
+    def read(self):
+        interval = 1.0 / self.get(cv2.CAP_PROP_FPS)
+        delay = self._next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_frame = max(self._next_frame, time.monotonic()) + interval
+        width = int(self.props[cv2.CAP_PROP_FRAME_WIDTH])
+        height = int(self.props[cv2.CAP_PROP_FRAME_HEIGHT])
+        frame = np.full((height, width, 3), self._count % 256, dtype=np.uint8)
+        self._count += 1
+        return True, frame
+
+    def release(self):
+        pass
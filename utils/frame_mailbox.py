@@ -0,0 +1,52 @@
+import itertools
+import threading
+import time
+
+
+class LatestFrameMailbox:
+    """
+    Hộp thư một ô giữa thread đọc camera và thread xử lý: chỉ giữ frame mới nhất
+    Người ghi thay cả ô (seq, ts_ns, frame) bằng một phép gán (nguyên tử dưới GIL), không khoá, không xếp hàng;
+    người đọc lấy frame mới hơn frame đã xử lý, frame cũ chưa kịp đọc bị bỏ qua.
+    """
+
+    def __init__(self):
+        self._slot = None  # (seq, ts_ns, frame)
+        self._seq = itertools.count(1)
+        self._event = threading.Event()  # chỉ để người đọc ngủ khi chưa có frame mới
+        self.closed = False
+
+    def publish(self, frame, ts_ns=None):
+        """Đặt frame mới (frame không được sửa sau khi publish)"""
+        self._slot = (next(self._seq), time.monotonic_ns() if ts_ns is None else ts_ns, frame)
+        self._event.set()
+
+    def latest(self, after_seq=0):
+        """Returns: (seq, ts_ns, frame) nếu có frame mới hơn after_seq, ngược lại None"""
+        slot = self._slot
+        if slot is not None and slot[0] > after_seq:
+            return slot
+        return None
+
+    def wait(self, after_seq=0, timeout=None):
+        """Chờ frame mới hơn after_seq. Returns: (seq, ts_ns, frame) hoặc None nếu hết timeout / đã đóng"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.closed:
+            slot = self.latest(after_seq)
+            if slot is not None:
+                return slot
+            self._event.clear()
+            # Kiểm tra lại sau khi clear để không lỡ frame vừa publish
+            slot = self.latest(after_seq)
+            if slot is not None:
+                return slot
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            self._event.wait(remaining)
+        return None
+
+    def close(self):
+        """Đánh thức người đọc đang chờ để thoát"""
+        self.closed = True
+        self._event.set()
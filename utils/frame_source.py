@@ -0,0 +1,156 @@
+import os
+import time
+import cv2
+from utils.camera_config import CaptureNegotiator
+
+
+class FrameSource:
+    """
+    Nguồn frame cho CameraThread: read() -> (ret, frame BGR, ts_ns)
+    ts_ns cùng gốc với time.monotonic_ns(); với file/ảnh, ts_ns lấy theo vị trí frame trong bản ghi
+    (mốc là lúc mở nguồn) nên thời gian của detector đi theo bản ghi chứ không theo tốc độ đọc.
+    max_speed=True: đọc nhanh nhất có thể (mọi frame đều được xử lý, không bỏ frame);
+    ngược lại phát theo nhịp thời gian thực.
+    """
+
+    live = False  # Camera / stream trực tiếp: không tua được, luôn thời gian thực
+
+    def __init__(self, max_speed=False):
+        self.max_speed = max_speed and not self.live
+        self.fps = 0.0
+        self._start_ns = None
+        self._start_mono = None
+
+    def open(self):
+        """Returns: True nếu mở được nguồn"""
+        raise NotImplementedError
+
+    def read(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def _start_clock(self):
+        self._start_ns = time.monotonic_ns()
+        self._start_mono = time.monotonic()
+
+    def _timestamp(self, position_s):
+        """Timestamp của frame ở vị trí position_s giây; chờ tới đúng lúc nếu phát thời gian thực"""
+        if not self.max_speed:
+            delay = self._start_mono + position_s - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return self._start_ns + int(position_s * 1e9)
+
+
+class CameraSource(FrameSource):
+    """Camera USB / RTSP trực tiếp, timestamp = thời điểm đọc xong frame"""
+
+    live = True
+
+    def __init__(self, source=0, camera_config=None, capture_factory=cv2.VideoCapture):
+        super().__init__()
+        self.source = source
+        self.negotiator = CaptureNegotiator.from_config(camera_config or {})
+        self.capture_factory = capture_factory
+        self.capture = None
+        self.capture_mode = None
+
+    def open(self):
+        self.capture = self.capture_factory(self.source)
+        if not self.capture.isOpened():
+            return False
+        # Cấu hình camera theo config, chọn FOURCC và đo FPS thực tế
+        self.capture_mode = self.negotiator.configure(self.capture)
+        self.fps = self.capture_mode.measured_fps or self.negotiator.fps
+        return True
+
+    def read(self):
+        ret, frame = self.capture.read()
+        return ret, frame, time.monotonic_ns()
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+
+
+class VideoFileSource(FrameSource):
+    """File video ghi sẵn, timestamp theo vị trí frame (CAP_PROP_POS_MSEC)"""
+
+    def __init__(self, path, max_speed=False):
+        super().__init__(max_speed)
+        self.path = path
+        self.capture = None
+        self._index = 0
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.path)
+        if not self.capture.isOpened():
+            return False
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self._index = 0
+        self._start_clock()
+        return True
+
+    def read(self):
+        ret, frame = self.capture.read()
+        if not ret:
+            return False, None, None
+        position_ms = self.capture.get(cv2.CAP_PROP_POS_MSEC)
+        # Một số backend không trả vị trí: suy ra từ chỉ số frame
+        position_s = position_ms / 1000 if position_ms > 0 or self._index == 0 else self._index / self.fps
+        self._index += 1
+        return True, frame, self._timestamp(position_s)
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """Thư mục ảnh (sắp theo tên), coi như video fps cố định"""
+
+    EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+    def __init__(self, directory, fps=30.0, max_speed=False):
+        super().__init__(max_speed)
+        self.directory = directory
+        self.fps = fps
+        self.files = []
+        self._index = 0
+
+    def open(self):
+        self.files = sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                            if name.lower().endswith(self.EXTENSIONS))
+        self._index = 0
+        self._start_clock()
+        return bool(self.files)
+
+    def read(self):
+        while self._index < len(self.files):
+            index = self._index
+            self._index += 1
+            frame = cv2.imread(self.files[index])
+            if frame is not None:
+                return True, frame, self._timestamp(index / self.fps)
+        return False, None, None
+
+
+def open_frame_source(camera_config, max_speed=None):
+    """
+    Tạo FrameSource từ mục 'camera' trong config.json
+    source: chỉ số camera / URL stream (rtsp://, http://) -> CameraSource; thư mục -> ImageDirectorySource;
+    file -> VideoFileSource. max_speed mặc định lấy từ camera.max_speed.
+    """
+    source = camera_config.get('source', 0)
+    if max_speed is None:
+        max_speed = camera_config.get('max_speed', False)
+
+    if isinstance(source, int) or str(source).isdigit():
+        return CameraSource(int(source), camera_config)
+    if '://' in str(source):
+        return CameraSource(source, camera_config)
+    if os.path.isdir(source):
+        return ImageDirectorySource(source, fps=camera_config.get('fps', 30), max_speed=max_speed)
+    return VideoFileSource(source, max_speed=max_speed)
@@ -9,6 +9,7 @@ from views.Dialogs import DrowsinessAlertDialog, RestAlertDialog
 import os
 import traceback
 import core.config as config
+from core.telemetry import telemetry
 
 
 class DashboardView(QWidget):
@@ -197,8 +198,16 @@ class DashboardView(QWidget):
         status_layout.addStretch()
         status_layout.addWidget(self.alert_count_label)
 
+        # Bảng telemetry để debug hiệu năng (bật bằng telemetry.debug_overlay trong config)
+        self.telemetry_label = QLabel()
+        self.telemetry_label.setFont(QFont('Consolas', 8))
+        self.telemetry_label.setStyleSheet("color: #7f8c8d;")
+        self.telemetry_label.setVisible(
+            telemetry.enabled and config.config.get('telemetry', {}).get('debug_overlay', False))
+
         layout.addWidget(self.camera_label, 1)
         layout.addLayout(status_layout)
+        layout.addWidget(self.telemetry_label)
         group.setLayout(layout)
         return group
 
@@ -326,6 +335,7 @@ class DashboardView(QWidget):
 
             from core.DrowsinessDetector import DrowsinessDetector
             from utils.CameraThread import CameraThread
+            from utils.frame_source import open_frame_source
 
             print(
                 f"🔧 Initializing detector with user_id={self.current_user['id']}, session_id={self.current_session_id}")
@@ -337,10 +347,13 @@ class DashboardView(QWidget):
             )
             print("✅ Detector initialized")
 
-            self.camera_thread = CameraThread(self.detector, camera_source=config.config.get("camera", 0)['source'])
+            self.camera_thread = CameraThread(self.detector, open_frame_source(config.config.get("camera", {})))
             self.camera_thread.frame_ready.connect(self.update_camera_frame)
             self.camera_thread.drowsiness_alert.connect(self.handle_drowsiness_alert)
             self.camera_thread.error_occurred.connect(self.handle_camera_error)
+            # Phát lại file video / thư mục ảnh xong: trả giao diện về trạng thái dừng
+            self.camera_thread.source_finished.connect(self.stop_monitoring)
+            self.camera_thread.frame_consumed(self.camera_label.width(), self.camera_label.height())
             self.camera_thread.start()
             print("✅ Camera started")
 
@@ -364,6 +377,8 @@ class DashboardView(QWidget):
             self.status_label.setStyleSheet("color: #27ae60; font-weight: bold;")
             self.update_timer = QTimer()
             self.update_timer.timeout.connect(self.update_drive_time)
+            if self.telemetry_label.isVisible():
+                self.update_timer.timeout.connect(self.update_telemetry_label)
             self.update_timer.start(1000)
 
             print("✅ System started")
@@ -454,10 +469,12 @@ class DashboardView(QWidget):
             self.update_alert_count()
             print("✅ Stopped")
 
-    def update_camera_frame(self, pixmap, status):
+    def update_camera_frame(self, image, status):
         try:
-            scaled_pixmap = pixmap.scaled(self.camera_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.camera_label.setPixmap(scaled_pixmap)
+            # Frame đã được thu nhỏ vừa label ở CameraThread, chỉ cần tạo QPixmap trên GUI thread
+            self.camera_label.setPixmap(QPixmap.fromImage(image))
+            if self.camera_thread:
+                self.camera_thread.frame_consumed(self.camera_label.width(), self.camera_label.height())
             if status['alert_active']:
                 self.status_label.setText("🔴 CẢNH BÁO!")
                 self.status_label.setStyleSheet("color: #e74c3c; font-weight: bold;")
@@ -567,6 +584,33 @@ class DashboardView(QWidget):
             seconds = elapsed % 60
             self.drive_time_label.setText(f"⏱️ {hours:02d}:{minutes:02d}:{seconds:02d}")
 
+    def update_telemetry_label(self):
+        """Cập nhật bảng telemetry: độ trễ p50/p99, FPS suy luận, frame bị bỏ, độ dài hàng đợi"""
+        snapshot = telemetry.snapshot()
+        histograms, counters, gauges = snapshot['histograms'], snapshot['counters'], snapshot['gauges']
+
+        def latency(name):
+            h = histograms.get(name)
+            if not h:
+                return "-"
+            rejected = h['negative'] + h['overflow']
+            # Mẫu âm / vượt phạm vi bị loại khỏi histogram: hiện số lượng để thấy số đo đang sai
+            return f"{h['p50']:.0f}/{h['p99']:.0f}" + (f" (loại {rejected})" if rejected else "")
+
+        def rate(name):
+            return counters.get(name, {}).get('rate', 0.0)
+
+        def total(name):
+            return counters.get(name, {}).get('total', 0)
+
+        self.telemetry_label.setText(
+            f"infer {rate('inference.frames'):.1f} fps | display {rate('display.frames'):.1f} fps | "
+            f"p50/p99 ms: infer {latency('latency.capture_to_inference_ms')}, "
+            f"display {latency('latency.capture_to_display_ms')}, batch {latency('inference.batch_ms')}\n"
+            f"queue {gauges.get('queue.processing', 0)}/{gauges.get('queue.result', 0)} | "
+            f"dropped: queue {total('frames.dropped_queue_full')}, display {total('display.dropped')}, "
+            f"replaced {total('capture.frames_replaced')}")
+
     def add_log(self, time, drive_time, status):
         """Thêm log vào bảng"""
         row = self.log_table.rowCount()
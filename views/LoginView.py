@@ -420,7 +420,6 @@ def get_latest_session_id(user_id: str) -> Optional[int]:
         
         row = cursor.fetchone()
         cursor.close()
-        conn.close()
         print("Lấy session ID cuối thành công")
         return row[0] if row else None
         